@@ -2,6 +2,7 @@
 Meeting Assistant - Redis Client
 Async Redis connection management
 """
+import msgpack
 import redis.asyncio as redis
 from typing import Optional
 import logging
@@ -62,6 +63,12 @@ class Queues:
     NOTIFICATION = "notification"
 
 
+# Queues that are Redis Streams read through consumer groups (the rest are lists)
+STREAM_QUEUES = frozenset({Queues.JOIN_MEETING, Queues.TRANSCRIPTION})
+# Stream queues whose payloads are msgpack rather than JSON
+MSGPACK_QUEUES = frozenset({Queues.TRANSCRIPTION})
+
+
 async def enqueue_job(queue: str, data: dict) -> str:
     """
     Add a job to a queue
@@ -80,7 +87,12 @@ async def enqueue_job(queue: str, data: dict) -> str:
         "created_at": str(__import__('datetime').datetime.utcnow().isoformat())
     }
     
-    await client.rpush(f"queue:{queue}", json.dumps(job))
+    if queue in MSGPACK_QUEUES:
+        await client.xadd(f"queue:{queue}", {"payload": msgpack.packb(job)})
+    elif queue in STREAM_QUEUES:
+        await client.xadd(f"queue:{queue}", {"payload": json.dumps(job)})
+    else:
+        await client.rpush(f"queue:{queue}", json.dumps(job))
     logger.info(f"Enqueued job {job_id} to {queue}")
     
     return job_id
@@ -88,8 +100,8 @@ async def enqueue_job(queue: str, data: dict) -> str:
 
 async def dequeue_job(queue: str, timeout: int = 0) -> Optional[dict]:
     """
-    Get a job from a queue (blocking)
-    Returns None if timeout reached
+    Get a job from a list queue (blocking)
+    Returns None if timeout reached. Stream queues are consumed by their services.
     """
     import json
     
@@ -54,6 +54,9 @@ export async function GET(request: Request) {
                     .update({
                         google_refresh_token: session.provider_refresh_token,
                         google_token_expires_at: new Date(Date.now() + (session.expires_in || 3600) * 1000).toISOString(),
+                        // New account/grant: the scheduler starts over with a full sync
+                        google_sync_token: null,
+                        google_sync_token_at: null,
                         settings: {
                             ...currentSettings,
                             auto_sync_calendar: true, // Enable auto sync when calendar is connected
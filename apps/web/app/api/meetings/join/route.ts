@@ -92,7 +92,8 @@ export async function POST(request: Request) {
 
             // Push to the same queue the orchestrator is listening to
             // default queue name: "queue:join_meeting"
-            await redis.rpush("queue:join_meeting", JSON.stringify(jobData));
+            // (a Redis Stream consumed through the orchestrators' consumer group)
+            await redis.xadd("queue:join_meeting", "*", "payload", JSON.stringify(jobData));
 
             // Close connection to prevent leaks in serverless/lambda environment
             redis.quit();
@@ -3,10 +3,10 @@ Transcription Load Test Scenario
 Tests transcription worker throughput
 """
 import asyncio
-import json
 import os
 import time
 from typing import Dict, List
+import msgpack
 import redis.asyncio as redis
 
 from .base import BaseScenario
@@ -72,7 +72,7 @@ class TranscriptionLoadScenario(BaseScenario):
                 "created_at": time.time(),
             }
             
-            await self.redis_client.rpush("queue:transcription", json.dumps(job))
+            await self.redis_client.xadd("queue:transcription", {"payload": msgpack.packb(job)})
             self.enqueued_jobs.append(job["id"])
             
             self.timing_collector.stop_timer(timer_id, success=True, 
@@ -87,7 +87,8 @@ class TranscriptionLoadScenario(BaseScenario):
         timeout = 600  # 10 minute timeout
         
         while time.time() - start < timeout:
-            queue_length = await self.redis_client.llen("queue:transcription")
+            # Workers delete entries once acknowledged
+            queue_length = await self.redis_client.xlen("queue:transcription")
             
             elapsed = int(time.time() - start)
             print(f"[{self.name}] {elapsed}s: {queue_length} jobs remaining in queue")
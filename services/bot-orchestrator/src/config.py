@@ -33,8 +33,12 @@ class Config:
     DOCKER_NETWORK: str = os.getenv("DOCKER_NETWORK", "meeting-assistant-network")
     RECORDINGS_VOLUME: str = os.getenv("RECORDINGS_VOLUME", "docker_recordings")
     
-    # Queue
+    # Queue (a Redis Stream read through a consumer group)
     JOIN_MEETING_QUEUE: str = "queue:join_meeting"
+    JOIN_MEETING_GROUP: str = "orchestrators"
+    # Jobs left unacked this long (a crashed orchestrator) are claimed again
+    JOB_VISIBILITY_TIMEOUT_MS: int = int(os.getenv("JOB_VISIBILITY_TIMEOUT", "300")) * 1000
+    RECLAIM_INTERVAL_SECONDS: int = 300
     
     # Timeouts
     CONTAINER_TIMEOUT_SECONDS: int = int(os.getenv("CONTAINER_TIMEOUT", "14400"))  # 4 hours
@@ -6,9 +6,11 @@ import asyncio
 import json
 import logging
 import os
+import socket
 from datetime import datetime
 
 import redis.asyncio as redis
+from redis.exceptions import ResponseError
 from supabase import create_client
 
 from .config import config
@@ -36,6 +38,8 @@ class BotOrchestrator:
         self.supabase = None
         self.container_manager = ContainerManager()
         self.running = True
+        # Stable across restarts of the same container, so its own pending jobs are resumed
+        self.consumer_name = f"{socket.gethostname()}-{os.getpid()}"
     
     async def initialize(self):
         """Initialize clients"""
@@ -50,26 +54,22 @@ class BotOrchestrator:
     
     async def run(self):
         """Main orchestrator loop"""
+        await self.ensure_consumer_group()
         logger.info("Bot Orchestrator started, waiting for jobs...")
         
-        # Start health check task
+        # Start health check and stalled-job reclaim tasks
         health_task = asyncio.create_task(self.health_check_loop())
+        reclaim_task = asyncio.create_task(self.reclaim_loop())
         
         try:
             while self.running:
                 try:
-                    # Blocking pop from queue
-                    result = await self.redis_client.blpop(
-                        config.JOIN_MEETING_QUEUE, 
-                        timeout=10
-                    )
+                    # Entries already delivered to this consumer but not acked
+                    # (reclaimed, or left by a crash under the same name) go first
+                    entries = await self.read_jobs("0") or await self.read_jobs(">", block=10000)
                     
-                    if result:
-                        _, job_json = result
-                        job = json.loads(job_json)
-                        
-                        logger.info(f"Received job: {job['id']}")
-                        await self.process_job(job)
+                    for message_id, fields in entries:
+                        await self.handle_entry(message_id, fields)
                         
                 except asyncio.CancelledError:
                     break
@@ -77,11 +77,66 @@ class BotOrchestrator:
                     logger.error(f"Error in orchestrator loop: {e}")
                     await asyncio.sleep(5)
         finally:
-            health_task.cancel()
+            for task in (health_task, reclaim_task):
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+    
+    async def ensure_consumer_group(self):
+        """Create the consumer group (and the stream) if they do not exist yet"""
+        try:
+            await self.redis_client.xgroup_create(
+                config.JOIN_MEETING_QUEUE, config.JOIN_MEETING_GROUP, id="0", mkstream=True
+            )
+            logger.info(f"Created consumer group {config.JOIN_MEETING_GROUP} on {config.JOIN_MEETING_QUEUE}")
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+    
+    async def read_jobs(self, stream_id: str, block: int = None) -> list:
+        """Read one entry for this consumer ("0": its pending entries, ">": new ones)"""
+        result = await self.redis_client.xreadgroup(
+            config.JOIN_MEETING_GROUP, self.consumer_name,
+            {config.JOIN_MEETING_QUEUE: stream_id}, count=1, block=block
+        )
+        return result[0][1] if result else []
+    
+    async def handle_entry(self, message_id: str, fields: dict):
+        """Process a stream entry, then acknowledge and delete it"""
+        try:
+            # Fields are empty when the entry was deleted after being delivered
+            if fields:
+                job = json.loads(fields["payload"])
+                
+                logger.info(f"Received job: {job['id']}")
+                await self.process_job(job)
+        finally:
+            # Spawn failures are recorded on the meeting; only a crash leaves
+            # the entry pending to be reclaimed
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                pipe.xack(config.JOIN_MEETING_QUEUE, config.JOIN_MEETING_GROUP, message_id)
+                pipe.xdel(config.JOIN_MEETING_QUEUE, message_id)
+                await pipe.execute()
+    
+    async def reclaim_loop(self):
+        """Periodically take over jobs that a crashed orchestrator never acknowledged"""
+        while True:
             try:
-                await health_task
+                await asyncio.sleep(config.RECLAIM_INTERVAL_SECONDS)
+                
+                claimed = await self.redis_client.xautoclaim(
+                    config.JOIN_MEETING_QUEUE, config.JOIN_MEETING_GROUP, self.consumer_name,
+                    min_idle_time=config.JOB_VISIBILITY_TIMEOUT_MS, justid=True
+                )
+                if claimed:
+                    logger.warning(f"Reclaimed {len(claimed)} stalled job(s): {claimed}")
+                    
             except asyncio.CancelledError:
-                pass
+                break
+            except Exception as e:
+                logger.error(f"Error reclaiming stalled jobs: {e}")
     
     async def process_job(self, job: dict):
         """Process a single job"""
@@ -3,6 +3,7 @@ Meet Bot - Google Meet Bot
 Main bot class using Playwright to join and record meetings
 """
 import asyncio
+import functools
 import logging
 from datetime import datetime
 from typing import Optional
@@ -47,6 +48,9 @@ class MeetBot:
         self.is_in_meeting = False
         self.meeting_ended = False
         self.start_time: Optional[datetime] = None
+
+        # Strong references to fire-and-forget tasks (asyncio only keeps weak refs)
+        self._background_tasks: set = set()
     
     async def start(self):
         """Initialize Playwright and browser with stealth mode"""
@@ -305,6 +309,18 @@ class MeetBot:
         await self.page.add_init_script(stealth_js)
         logger.info("Advanced stealth scripts applied")
 
+    def _screenshot_in_background(self, path: str):
+        """Take a debug screenshot without blocking the caller (100-500ms per capture)"""
+        task = asyncio.create_task(self.page.screenshot(path=path))
+        self._background_tasks.add(task)
+
+        def _on_done(t: asyncio.Task):
+            self._background_tasks.discard(t)
+            if not t.cancelled() and t.exception():
+                logger.debug(f"Background screenshot {path} failed: {t.exception()}")
+
+        task.add_done_callback(_on_done)
+
     async def _capture_diagnostic_info(self, prefix: str = "diagnostic"):
         """Capture diagnostic information for debugging"""
         try:
@@ -741,7 +757,7 @@ class MeetBot:
                     logger.info(f"Found join button via get_by_role: {button_text}")
                     await btn.first.click()
                     await asyncio.sleep(1)
-                    await self.page.screenshot(path="/recordings/05_after_join_click.png")
+                    self._screenshot_in_background("/recordings/05_after_join_click.png")
                     logger.info(f"Clicked join button: {button_text}")
                     return
             except Exception:
@@ -772,7 +788,7 @@ class MeetBot:
                     logger.info(f"Found join button: {selector}")
                     await btn.click()
                     await asyncio.sleep(1)
-                    await self.page.screenshot(path="/recordings/05_after_join_click.png")
+                    self._screenshot_in_background("/recordings/05_after_join_click.png")
                     logger.info(f"Clicked join button: {selector}")
                     return
             except Exception:
@@ -782,7 +798,7 @@ class MeetBot:
         logger.info("Trying Enter key as fallback for join button...")
         await self.page.keyboard.press("Enter")
         await asyncio.sleep(1)
-        await self.page.screenshot(path="/recordings/05_after_enter_key.png")
+        self._screenshot_in_background("/recordings/05_after_enter_key.png")
 
         # Check if we're now joining
         joining_indicators = [
@@ -800,14 +816,30 @@ class MeetBot:
             except:
                 pass
 
-        # Strategy 4: Tab + Enter (in case button needs to be focused first)
-        logger.info("Trying Tab+Enter as fallback...")
-        for _ in range(5):  # Try a few tabs
-            await self.page.keyboard.press("Tab")
-            await asyncio.sleep(0.2)
-        await self.page.keyboard.press("Enter")
+        # Strategy 4: Scan visible buttons in-page and click the first join-like one
+        # (replaces Tab cycling: one round-trip instead of 5 key presses + sleeps)
+        logger.info("Trying in-page button scan as fallback...")
+        try:
+            clicked = await self.page.evaluate("""
+                () => {
+                    const btns = [...document.querySelectorAll('button:not([disabled])')]
+                        .filter(b => b.offsetParent);
+                    for (const b of btns) {
+                        const t = ((b.textContent || '') + ' ' + (b.getAttribute('aria-label') || '')).toLowerCase();
+                        if (/join|participar|ask to join|pedir/.test(t)) {
+                            b.click();
+                            return true;
+                        }
+                    }
+                    return false;
+                }
+            """)
+            if clicked:
+                logger.info("Clicked join button via in-page scan")
+        except Exception as e:
+            logger.debug(f"In-page join button scan failed: {e}")
         await asyncio.sleep(1)
-        await self.page.screenshot(path="/recordings/05_after_tab_enter.png")
+        self._screenshot_in_background("/recordings/05_after_button_scan.png")
 
         # Final fallback: dump page content if join button not found
         logger.warning("Could not find or click join button - check screenshots")
@@ -932,11 +964,12 @@ class MeetBot:
                     except Exception as e:
                         logger.debug(f"Locator check failed: {e}")
 
-                    # Also try direct attribute check
+                    # Also try direct attribute check (labels of first 20 buttons in one round-trip)
                     try:
-                        buttons = await self.page.query_selector_all('button')
-                        for btn in buttons[:20]:  # Check first 20 buttons
-                            label = await btn.get_attribute('aria-label')
+                        labels = await self.page.locator('button').evaluate_all(
+                            "btns => btns.slice(0, 20).map(b => b.getAttribute('aria-label'))"
+                        )
+                        for label in labels:
                             if label and ('Sair' in label or 'Leave' in label):
                                 logger.info(f"Found button with label '{label}' - we're in the meeting!")
                                 return
@@ -946,7 +979,7 @@ class MeetBot:
             # Log progress every 10 seconds
             if i > 0 and i % 10 == 0:
                 logger.info(f"Still waiting for admission... ({i}s) in_waiting={in_waiting}")
-                await self.page.screenshot(path=f"/recordings/waiting_{i}s.png")
+                self._screenshot_in_background(f"/recordings/waiting_{i}s.png")
 
             await asyncio.sleep(1)
 
@@ -957,7 +990,14 @@ class MeetBot:
     async def start_recording(self):
         """Start recording the meeting"""
         logger.info("Starting recording...")
-        await self.recorder.start()
+        stream_factory = None
+        if config.STREAMING_UPLOAD:
+            stream_factory = functools.partial(
+                self.uploader.open_recording_stream,
+                user_id=self.user_id,
+                meeting_id=self.meeting_id
+            )
+        await self.recorder.start(stream_factory)
         
         # Start caption scraping for speaker detection
         if self.page:
@@ -979,11 +1019,13 @@ class MeetBot:
     async def upload_recording(self, recording_path) -> str:
         """Upload recording to R2"""
         logger.info("Uploading recording to R2...")
-        storage_path = self.uploader.upload_recording(
-            recording_path,
-            self.user_id,
-            self.meeting_id
-        )
+        storage_path = await self._finish_streaming_upload(recording_path)
+        if not storage_path:
+            storage_path = await self.uploader.upload_recording(
+                recording_path,
+                self.user_id,
+                self.meeting_id
+            )
         logger.info(f"Recording uploaded: {storage_path}")
         
         # Upload captions if available
@@ -1004,7 +1046,7 @@ class MeetBot:
                         json_path = Path(tmp_json.name)
                     
                     try:
-                        self.uploader.upload_captions_json(
+                        await self.uploader.upload_captions_json(
                             json_path,
                             self.user_id,
                             self.meeting_id
@@ -1019,6 +1061,29 @@ class MeetBot:
         
         return storage_path
     
+    async def _finish_streaming_upload(self, recording_path) -> Optional[str]:
+        """Complete the upload streamed during recording; None means fall back to a full upload"""
+        stream = self.recorder.stream_upload
+        if not stream:
+            return None
+        self.recorder.stream_upload = None
+        
+        if not stream.key.endswith(f"/{Path(recording_path).name}"):
+            logger.warning(f"Streamed upload {stream.key} does not match {recording_path}, discarding")
+            await asyncio.to_thread(stream.abort)
+            return None
+        
+        try:
+            storage_path = await asyncio.to_thread(stream.finish, 300)
+        except Exception as e:
+            logger.error(f"Completing streamed upload failed: {e}")
+            await asyncio.to_thread(stream.abort)
+            storage_path = None
+        
+        if not storage_path:
+            logger.warning("Streaming upload unavailable, falling back to full upload")
+        return storage_path
+    
     async def monitor_meeting(self):
         """Monitor the meeting and detect when it ends"""
         logger.info("Monitoring meeting...")
@@ -135,17 +135,26 @@ class CaptionScraper:
         };
         
         // Find the captions container (aria-live region)
+        // Memoized on window so re-injections reuse it while it is still attached,
+        // avoiding a getBoundingClientRect (forced layout) per region each time
         const findCaptionContainer = () => {
+            const cached = window.__captionContainer;
+            if (cached && document.body.contains(cached)) {
+                return cached;
+            }
+
             // Google Meet captions are typically in an aria-live region
             const liveRegions = document.querySelectorAll('[aria-live="polite"], [role="region"]');
             for (const region of liveRegions) {
                 // Caption container is usually relatively small and positioned at bottom
                 const rect = region.getBoundingClientRect();
                 if (rect.bottom > window.innerHeight * 0.7 && rect.height < 200) {
+                    // Only a region identified as the caption area is memoized
+                    window.__captionContainer = region;
                     return region;
                 }
             }
-            // Fallback to any aria-live region
+            // Fallback to any aria-live region (searched again on the next injection)
             return document.querySelector('[aria-live="polite"]') || document.body;
         };
         
@@ -252,35 +261,13 @@ class CaptionScraper:
             # Wait a bit for the meeting to fully load
             await asyncio.sleep(2)
             
-            # Try pressing 'c' to toggle captions
-            await self.page.keyboard.press('c')
-            await asyncio.sleep(1)
-            
-            # Check if captions region appeared
-            caption_region = await self.page.query_selector('[aria-live="polite"]')
-            if caption_region:
-                logger.info("Captions enabled via 'c' key")
+            # All strategies (c key, captions button, Shift+C) run inside the
+            # page in a single round-trip
+            result = await self.page.evaluate(self.ENABLE_CAPTIONS_JS)
+            if result.get('enabled', False):
+                logger.info(f"Captions enabled via {result.get('method')}")
                 return True
             
-            # Try clicking captions button
-            caption_selectors = [
-                '[aria-label*="caption" i]',
-                '[aria-label*="legenda" i]',
-                '[aria-label*="Ativar legendas"]',
-                '[aria-label*="Turn on captions"]',
-            ]
-            
-            for selector in caption_selectors:
-                try:
-                    btn = await self.page.wait_for_selector(selector, timeout=2000)
-                    if btn:
-                        await btn.click()
-                        logger.info(f"Captions enabled via button: {selector}")
-                        await asyncio.sleep(1)
-                        return True
-                except:
-                    pass
-            
             logger.warning("Could not enable captions - will continue without")
             return False
             
@@ -305,7 +292,7 @@ class CaptionScraper:
             if 'Bot' in speaker or 'Meeting-Assistant' in speaker:
                 return
             
-            logger.info(f"[Caption] {speaker}: {text}")
+            logger.debug("[Caption] %s: %s", speaker, text)
             
             # Check if this extends an existing segment from same speaker
             if speaker in self._active_segments:
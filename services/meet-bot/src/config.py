@@ -2,81 +2,120 @@
 Meet Bot - Configuration
 """
 import os
+from dataclasses import dataclass, field
+from functools import cache
+from types import MappingProxyType
 
 
+def _env(name: str, default: str):
+    """Field whose value is read from the environment when Config is built"""
+    return field(default_factory=lambda: os.getenv(name, default))
+
+
+def _env_int(name: str, default: str):
+    return field(default_factory=lambda: int(os.getenv(name, default)))
+
+
+def _env_bool(name: str, default: str):
+    return field(default_factory=lambda: os.getenv(name, default).lower() == "true")
+
+
+@dataclass(frozen=True, slots=True)
 class Config:
     """Configuration for the Meet Bot"""
-    
+
     # Meeting Configuration
-    MEETING_URL: str = os.getenv("MEETING_URL", "")
-    MEETING_ID: str = os.getenv("MEETING_ID", "")
-    USER_ID: str = os.getenv("USER_ID", "")
-    
+    MEETING_URL: str = _env("MEETING_URL", "")
+    MEETING_ID: str = _env("MEETING_ID", "")
+    USER_ID: str = _env("USER_ID", "")
+
     # Bot Display
-    BOT_NAME: str = os.getenv("BOT_DISPLAY_NAME", "RKJ.AI")
-    BOT_CAMERA_ENABLED: bool = os.getenv("BOT_CAMERA_ENABLED", "false").lower() == "true"
-    
+    BOT_NAME: str = _env("BOT_DISPLAY_NAME", "RKJ.AI")
+    BOT_CAMERA_ENABLED: bool = _env_bool("BOT_CAMERA_ENABLED", "false")
+
     # Recording
-    RECORDING_DIR: str = os.getenv("RECORDING_DIR", "/recordings")
-    RECORDING_QUALITY: str = os.getenv("BOT_RECORDING_QUALITY", "1080p")
-    MAX_DURATION_HOURS: int = int(os.getenv("BOT_MAX_DURATION_HOURS", "4"))
-    
+    RECORDING_DIR: str = _env("RECORDING_DIR", "/recordings")
+    RECORDING_QUALITY: str = _env("BOT_RECORDING_QUALITY", "1080p")
+    MAX_DURATION_HOURS: int = _env_int("BOT_MAX_DURATION_HOURS", "4")
+    # Allow env var override for bitrate, default to 1000k for size optimization
+    VIDEO_BITRATE: str = _env("VIDEO_BITRATE", "1000k")
+    # Video encoder: "vaapi", "nvenc", "none" (libx264) or "auto" (vaapi if available)
+    HW_ACCEL: str = _env("HW_ACCEL", "auto")
+    VAAPI_DEVICE: str = _env("VAAPI_DEVICE", "/dev/dri/renderD128")
+    # Pipe FFmpeg output to R2 (multipart) while recording, teeing a local copy
+    STREAMING_UPLOAD: bool = _env_bool("STREAMING_UPLOAD", "false")
+
     # Timeouts (seconds)
-    JOIN_TIMEOUT: int = int(os.getenv("JOIN_TIMEOUT", "120"))
-    PAGE_LOAD_TIMEOUT: int = int(os.getenv("PAGE_LOAD_TIMEOUT", "30"))
+    JOIN_TIMEOUT: int = _env_int("JOIN_TIMEOUT", "120")
+    PAGE_LOAD_TIMEOUT: int = _env_int("PAGE_LOAD_TIMEOUT", "30")
 
     # Retry Configuration
-    MAX_JOIN_RETRIES: int = int(os.getenv("MAX_JOIN_RETRIES", "3"))
-    INITIAL_RETRY_DELAY: int = int(os.getenv("INITIAL_RETRY_DELAY", "5"))
-    MAX_RETRY_DELAY: int = int(os.getenv("MAX_RETRY_DELAY", "30"))
+    MAX_JOIN_RETRIES: int = _env_int("MAX_JOIN_RETRIES", "3")
+    INITIAL_RETRY_DELAY: int = _env_int("INITIAL_RETRY_DELAY", "5")
+    MAX_RETRY_DELAY: int = _env_int("MAX_RETRY_DELAY", "30")
 
     # Early Recording Mode (start recording before confirming join)
-    EARLY_RECORDING_MODE: bool = os.getenv("EARLY_RECORDING_MODE", "false").lower() == "true"
-    
+    EARLY_RECORDING_MODE: bool = _env_bool("EARLY_RECORDING_MODE", "false")
+
     # Supabase
-    SUPABASE_URL: str = os.getenv("SUPABASE_URL", "")
-    SUPABASE_SERVICE_KEY: str = os.getenv("SUPABASE_SERVICE_KEY", "")
-    
+    SUPABASE_URL: str = _env("SUPABASE_URL", "")
+    SUPABASE_SERVICE_KEY: str = _env("SUPABASE_SERVICE_KEY", "")
+
     # Redis
-    REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379")
-    
+    REDIS_URL: str = _env("REDIS_URL", "redis://localhost:6379")
+
     # Cloudflare R2
-    R2_ACCOUNT_ID: str = os.getenv("R2_ACCOUNT_ID", "")
-    R2_ACCESS_KEY_ID: str = os.getenv("R2_ACCESS_KEY_ID", "")
-    R2_SECRET_ACCESS_KEY: str = os.getenv("R2_SECRET_ACCESS_KEY", "")
-    R2_BUCKET_NAME: str = os.getenv("R2_BUCKET_NAME", "meeting-assistant")
-    R2_PUBLIC_URL: str = os.getenv("R2_PUBLIC_URL", "")  # Public URL for R2 (e.g., https://pub-xxx.r2.dev)
-    
+    R2_ACCOUNT_ID: str = _env("R2_ACCOUNT_ID", "")
+    R2_ACCESS_KEY_ID: str = _env("R2_ACCESS_KEY_ID", "")
+    R2_SECRET_ACCESS_KEY: str = _env("R2_SECRET_ACCESS_KEY", "")
+    R2_BUCKET_NAME: str = _env("R2_BUCKET_NAME", "meeting-assistant")
+    R2_PUBLIC_URL: str = _env("R2_PUBLIC_URL", "")  # Public URL for R2 (e.g., https://pub-xxx.r2.dev)
+
     # OpenAI (Transcription)
-    OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
-    OPENAI_WHISPER_MODEL: str = os.getenv("OPENAI_WHISPER_MODEL", "whisper-1")
-    TRANSCRIPTION_LANGUAGE: str = os.getenv("TRANSCRIPTION_LANGUAGE", "pt")
-    
+    OPENAI_API_KEY: str = _env("OPENAI_API_KEY", "")
+    OPENAI_WHISPER_MODEL: str = _env("OPENAI_WHISPER_MODEL", "whisper-1")
+    TRANSCRIPTION_LANGUAGE: str = _env("TRANSCRIPTION_LANGUAGE", "pt")
+
     # Display
-    DISPLAY: str = os.getenv("DISPLAY", ":99")
+    DISPLAY: str = _env("DISPLAY", ":99")
     RESOLUTION: tuple = (1920, 1080)
 
-    
-    # FFmpeg settings based on quality
-    @classmethod
-    def get_ffmpeg_settings(cls) -> dict:
-        # Allow env var override for bitrate, default to 1000k for size optimization
-        video_bitrate = os.getenv("VIDEO_BITRATE", "1000k")
-        
-        if cls.RECORDING_QUALITY == "1080p":
-            return {
-                "resolution": "1920x1080",
-                "framerate": "30",
-                "video_bitrate": video_bitrate,
-                "audio_bitrate": "128k"
-            }
-        else:  # 720p
-            return {
-                "resolution": "1280x720",
-                "framerate": "25",
-                "video_bitrate": "800k", # Lower for 720p too
-                "audio_bitrate": "128k"
-            }
-
-
-config = Config()
+    # FFmpeg settings based on quality (derived once in __post_init__)
+    _ffmpeg_settings: MappingProxyType = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(
+            self,
+            "_ffmpeg_settings",
+            _build_ffmpeg_settings(self.RECORDING_QUALITY, self.VIDEO_BITRATE),
+        )
+
+    def get_ffmpeg_settings(self) -> MappingProxyType:
+        return self._ffmpeg_settings
+
+
+def _build_ffmpeg_settings(quality: str, video_bitrate: str) -> MappingProxyType:
+    """Build the (read-only) FFmpeg settings for a quality/bitrate pair"""
+    if quality == "1080p":
+        return MappingProxyType({
+            "resolution": "1920x1080",
+            "framerate": "30",
+            "video_bitrate": video_bitrate,
+            "audio_bitrate": "128k"
+        })
+    else:  # 720p
+        return MappingProxyType({
+            "resolution": "1280x720",
+            "framerate": "25",
+            "video_bitrate": "800k", # Lower for 720p too
+            "audio_bitrate": "128k"
+        })
+
+
+@cache
+def get_config() -> Config:
+    """Return the process-wide Config, reading the environment on first call"""
+    return Config()
+
+
+config = get_config()
@@ -0,0 +1,30 @@
+"""
+Meet Bot - Logging Setup
+Records are only enqueued on the event-loop thread; a listener thread does the
+(blocking) stream writes
+"""
+import logging
+import logging.handlers
+import queue
+from typing import Optional
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+def setup_logging(level: str, stream=None) -> logging.handlers.QueueListener:
+    """Route root logging through a queue to a stream handler; returns the started listener"""
+    stream_handler = logging.StreamHandler(stream)
+    stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    queue_handler = logging.handlers.QueueHandler(queue.SimpleQueue())
+    # prepare() bakes the formatted text into the record; only the message (and
+    # traceback) belongs there, the stream handler applies LOG_FORMAT once
+    queue_handler.setFormatter(logging.Formatter('%(message)s'))
+
+    listener = logging.handlers.QueueListener(
+        queue_handler.queue, stream_handler, respect_handler_level=True
+    )
+    listener.start()
+
+    logging.basicConfig(level=level, handlers=[queue_handler], force=True)
+    return listener
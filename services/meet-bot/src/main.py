@@ -2,29 +2,30 @@
 Meet Bot - Main Entry Point
 """
 import asyncio
-import json
+import atexit
+import functools
 import logging
 import os
 import signal
 import sys
-from datetime import datetime
+from datetime import datetime, timezone
 
+import msgpack
 import redis.asyncio as redis
 from supabase import create_client
 
 from .config import config
+from .logging_setup import setup_logging
 from .bot import MeetBot
 from .transcriber import Transcriber
 
 # Global reference for signal handlers
 _bot_instance = None
-_shutdown_requested = False
+_shutdown_event = asyncio.Event()
 
 # Configure logging
-logging.basicConfig(
-    level=os.getenv("LOG_LEVEL", "INFO"),
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+_log_listener = setup_logging(os.getenv("LOG_LEVEL", "INFO"))
+atexit.register(_log_listener.stop)
 logger = logging.getLogger(__name__)
 
 # Exit codes
@@ -38,16 +39,33 @@ EXIT_UPLOAD_ERROR = 5
 
 DRY_RUN = os.getenv("DRY_RUN", "false").lower() == "true"
 
+# How often the DOM is probed for "meeting ended" while recording (seconds)
+MEETING_END_POLL_INTERVAL = 10
+
+
+@functools.lru_cache(maxsize=1)
+def _get_transcriber() -> Transcriber:
+    """Shared Transcriber, so its OpenAI client (and connection pool) is built once"""
+    return Transcriber()
+
+
+def _utcnow_iso() -> str:
+    """Current UTC time as ISO-8601 (second precision, timezone-aware)"""
+    return datetime.now(timezone.utc).isoformat(timespec='seconds')
+
 
 async def update_meeting_status(supabase, meeting_id: str, status: str, **kwargs):
     """Update meeting status in database"""
     if DRY_RUN:
         logger.info(f"[DRY_RUN] Would update meeting {meeting_id} to status: {status}")
         return
-    update_data = {"status": status, "updated_at": datetime.utcnow().isoformat()}
+    update_data = {"status": status, "updated_at": _utcnow_iso()}
     update_data.update(kwargs)
     
-    supabase.table('meetings').update(update_data).eq('id', meeting_id).execute()
+    # supabase-py is synchronous; run it in a worker thread so the event loop keeps ticking
+    await asyncio.to_thread(
+        lambda: supabase.table('meetings').update(update_data).eq('id', meeting_id).execute()
+    )
     logger.info(f"Updated meeting {meeting_id} status to: {status}")
 
 
@@ -62,7 +80,7 @@ async def create_recording_record(supabase, meeting_id: str, storage_path: str,
     if config.R2_PUBLIC_URL and storage_path:
         storage_url = f"{config.R2_PUBLIC_URL}/{storage_path}"
     
-    recording = supabase.table('recordings').insert({
+    recording_data = {
         "meeting_id": meeting_id,
         "file_type": "combined",
         "file_name": os.path.basename(storage_path),
@@ -71,7 +89,11 @@ async def create_recording_record(supabase, meeting_id: str, storage_path: str,
         "duration_seconds": duration,
         "format": "mp4",
         "is_processed": True
-    }).execute().data[0]
+    }
+    result = await asyncio.to_thread(
+        lambda: supabase.table('recordings').insert(recording_data).execute()
+    )
+    recording = result.data[0]
     
     logger.info(f"Created recording record: {recording['id']} with URL: {storage_url}")
     return recording['id']
@@ -91,32 +113,37 @@ async def enqueue_transcription(redis_client, meeting_id: str, recording_id: str
             "user_id": user_id
         },
         "status": "queued",
-        "created_at": datetime.utcnow().isoformat()
+        "created_at": _utcnow_iso()
     }
     
-    await redis_client.rpush("queue:transcription", json.dumps(job))
+    # Pipelined so further commands (retries, status events) share one round-trip
+    async with redis_client.pipeline(transaction=False) as pipe:
+        # msgpack, the transcription queue's job format
+        pipe.xadd("queue:transcription", {"payload": msgpack.packb(job)})
+        await pipe.execute()
     logger.info(f"Enqueued transcription job for meeting {meeting_id}")
 
 
-def handle_shutdown_signal(signum, frame):
+def handle_shutdown_signal(signum):
     """Handle shutdown signals (SIGINT, SIGTERM) gracefully"""
-    global _shutdown_requested
     signal_name = signal.Signals(signum).name
     logger.info(f"Received {signal_name}, initiating graceful shutdown...")
-    _shutdown_requested = True
+    # Runs on the event loop (add_signal_handler), so the monitor wakes immediately
+    _shutdown_event.set()
 
 
 async def main():
     """Main entry point"""
-    global _bot_instance, _shutdown_requested
+    global _bot_instance
 
     logger.info("=" * 50)
     logger.info("Meet Bot Starting")
     logger.info("=" * 50)
 
-    # Setup signal handlers for graceful shutdown
-    signal.signal(signal.SIGINT, handle_shutdown_signal)
-    signal.signal(signal.SIGTERM, handle_shutdown_signal)
+    # Setup signal handlers for graceful shutdown (delivered via the loop's wakeup fd)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, handle_shutdown_signal, sig)
 
     # Get meeting info from environment
     meeting_url = config.MEETING_URL
@@ -133,7 +160,12 @@ async def main():
 
     # Initialize clients
     supabase = create_client(config.SUPABASE_URL, config.SUPABASE_SERVICE_KEY)
-    redis_client = redis.from_url(config.REDIS_URL, decode_responses=True)
+    redis_client = redis.from_url(
+        config.REDIS_URL,
+        decode_responses=True,
+        max_connections=4,
+        socket_keepalive=True
+    )
 
     # Create bot
     bot = MeetBot(meeting_id, meeting_url, user_id)
@@ -180,7 +212,7 @@ async def main():
         # Update status to recording
         await update_meeting_status(
             supabase, meeting_id, "recording",
-            actual_start=datetime.utcnow().isoformat()
+            actual_start=_utcnow_iso()
         )
 
         # Start recording immediately if not already started
@@ -192,35 +224,49 @@ async def main():
         logger.info("Monitoring meeting (Ctrl+C to stop and save recording)...")
 
         async def monitor_with_shutdown():
-            """Monitor meeting with shutdown signal check"""
-            global _shutdown_requested
-            check_count = 0
-            while bot.is_in_meeting and not bot.meeting_ended:
-                check_count += 1
-
-                # Check for shutdown signal
-                if _shutdown_requested:
-                    logger.info("Shutdown signal received, stopping recording...")
-                    return
-
-                # Check if meeting ended
-                if await bot._check_meeting_ended():
-                    logger.info("Meeting ended detected")
-                    bot.meeting_ended = True
-                    return
-
-                # Check max duration
-                if await bot.recorder.is_max_duration_reached():
-                    logger.info("Max duration reached")
-                    bot.meeting_ended = True
-                    return
-
-                # Log status periodically (every 30 seconds)
-                if check_count % 15 == 0:
-                    duration = bot.recorder.get_duration_seconds() if bot.recorder else 0
-                    logger.info(f"Still recording... Duration: {duration}s")
-
-                await asyncio.sleep(2)
+            """Wait for whichever comes first: shutdown signal, meeting end, or max duration"""
+            if not bot.is_in_meeting or bot.meeting_ended:
+                return
+
+            async def poll_meeting_ended():
+                check_count = 0
+                while True:
+                    await asyncio.sleep(MEETING_END_POLL_INTERVAL)
+                    check_count += 1
+
+                    # Check if meeting ended
+                    if await bot._check_meeting_ended():
+                        logger.info("Meeting ended detected")
+                        return
+
+                    # Log status periodically (every 30 seconds)
+                    if check_count % 3 == 0:
+                        duration = bot.recorder.get_duration_seconds() if bot.recorder else 0
+                        logger.debug("Still recording... Duration: %ss", duration)
+
+            max_seconds = config.MAX_DURATION_HOURS * 3600
+            remaining = max(0, max_seconds - bot.recorder.get_duration_seconds())
+
+            shutdown_task = asyncio.create_task(_shutdown_event.wait())
+            ended_task = asyncio.create_task(poll_meeting_ended())
+            timer_task = asyncio.create_task(asyncio.sleep(remaining))
+            tasks = {shutdown_task, ended_task, timer_task}
+
+            try:
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+            if shutdown_task in done:
+                logger.info("Shutdown signal received, stopping recording...")
+            elif ended_task in done:
+                ended_task.result()  # Re-raise unexpected poller errors
+                bot.meeting_ended = True
+            else:
+                logger.info("Max duration reached")
+                bot.meeting_ended = True
 
         await monitor_with_shutdown()
 
@@ -240,7 +286,7 @@ async def main():
         # Update status to processing
         await update_meeting_status(
             supabase, meeting_id, "processing",
-            actual_end=datetime.utcnow().isoformat(),
+            actual_end=_utcnow_iso(),
             duration_seconds=bot.get_duration_seconds()
         )
         
@@ -267,13 +313,13 @@ async def main():
         try:
             if config.OPENAI_API_KEY:
                 logger.info("Starting transcription...")
-                transcriber = Transcriber()
+                transcriber = _get_transcriber()
                 
                 # Get caption segments with speaker info (from live captions)
                 caption_segments = None
                 if bot.caption_scraper:
                     caption_segments = bot.caption_scraper.get_segments()
-                    logger.info(f"Caption data: {len(caption_segments)} segments captured with speaker names")
+                    logger.debug("Caption data: %d segments captured with speaker names", len(caption_segments))
                 
                 # Transcribe the audio with speaker info from captions
                 transcription_result = await transcriber.transcribe_audio(
@@ -281,17 +327,29 @@ async def main():
                     caption_segments=caption_segments
                 )
                 
-                # Save transcription file locally
+                # Render once; upload straight from memory while the local copy
+                # is written in a worker thread
                 transcription_path = recording_path.parent / "transcription.txt"
-                transcriber.save_transcription_file(transcription_result, transcription_path)
+                transcription_bytes = transcriber.render_transcription(transcription_result)
+                save_task = asyncio.create_task(asyncio.to_thread(
+                    transcriber.save_transcription_file,
+                    transcription_result,
+                    transcription_path,
+                    data=transcription_bytes
+                ))
                 
                 # Upload to R2
-                transcription_storage_path = bot.uploader.upload_transcription(
-                    transcription_path,
+                transcription_storage_path = await bot.uploader.upload_transcription(
+                    transcription_bytes,
                     user_id,
                     meeting_id
                 )
                 logger.info(f"Transcription uploaded: {transcription_storage_path}")
+                
+                try:
+                    await save_task
+                except Exception as save_err:
+                    logger.warning(f"Could not save local transcription copy: {save_err}")
             else:
                 logger.warning("OPENAI_API_KEY not set, skipping transcription")
         except Exception as e:
@@ -375,4 +433,10 @@ async def main():
 
 
 if __name__ == "__main__":
+    # uvloop is a drop-in, faster event loop; fall back to asyncio's default if missing
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
     asyncio.run(main())
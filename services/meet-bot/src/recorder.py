@@ -5,57 +5,95 @@ Handles screen and audio recording using FFmpeg
 import asyncio
 import logging
 import os
+import re
+import shutil
 import signal
+import subprocess
+import threading
+import time
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Optional
 
 from .config import config
 
 logger = logging.getLogger(__name__)
 
+# FFmpeg stderr is drained in bulk by a reader thread rather than line by line
+STDERR_READ_SIZE = 65536
+# Longest partial stderr line carried over between reads (the rest is dropped)
+STDERR_TAIL_MAX = 4096
+# FFmpeg ends lines with \n, and status lines with \r
+STDERR_LINE_END = re.compile(rb"[\r\n]")
+# Read size for FFmpeg stdout when the output is piped (streaming upload)
+STDOUT_READ_SIZE = 1024 * 1024
+
 
 class Recorder:
     """Handles recording of screen and audio using FFmpeg"""
     
     def __init__(self, meeting_id: str):
         self.meeting_id = meeting_id
-        self.process: Optional[asyncio.subprocess.Process] = None
+        self.process: Optional[subprocess.Popen] = None
+        self._stderr_thread: Optional[threading.Thread] = None
+        self._stdout_thread: Optional[threading.Thread] = None
+        self.stream_upload = None  # MultipartStreamUpload fed from FFmpeg stdout
         self.recording_path: Optional[Path] = None
         self.is_recording = False
-        self.start_time: Optional[datetime] = None
+        self.start_time: Optional[datetime] = None  # Wall clock, for logging only
+        self._start_monotonic: Optional[float] = None
+
+        # Bind config values once instead of re-reading them on every call
+        self._recording_dir = Path(config.RECORDING_DIR)
+        self._display = config.DISPLAY
+
+        # FFmpeg arguments minus the output target, built once per output mode
+        # (file / pipe) and reused by any restart
+        self._cmd_prefixes: dict = {}
     
     def _get_output_path(self) -> Path:
         """Generate output file path"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        timestamp = time.strftime("%Y%m%d_%H%M%S")
         filename = f"meeting_{self.meeting_id}_{timestamp}.mp4"
-        return Path(config.RECORDING_DIR) / filename
+        return self._recording_dir / filename
     
-    def _build_ffmpeg_command(self, output_path: Path) -> list:
-        """Build FFmpeg command for recording"""
+    def _build_ffmpeg_command(self, output_path: Path, to_pipe: bool = False) -> list:
+        """Build FFmpeg command for recording (to_pipe writes the MP4 to stdout instead)"""
+        prefix = self._cmd_prefixes.get(to_pipe)
+        if prefix is None:
+            prefix = self._cmd_prefixes[to_pipe] = self._build_ffmpeg_prefix(to_pipe)
+        return [*prefix, "pipe:1" if to_pipe else str(output_path)]
+
+    def _build_ffmpeg_prefix(self, to_pipe: bool) -> tuple:
+        """Build every FFmpeg argument except the trailing output target"""
         settings = config.get_ffmpeg_settings()
 
+        hw_accel = self._resolve_hw_accel()
+
         # FFmpeg command to capture X11 display + PulseAudio
         cmd = [
             "ffmpeg",
             "-y",  # Overwrite output file
+            "-nostats",  # No \r-terminated progress lines on stderr
+        ]
+
+        if hw_accel == "vaapi":
+            # Must come before the inputs
+            cmd += ["-vaapi_device", config.VAAPI_DEVICE]
 
+        cmd += [
             # Video input (X11 screen capture)
             "-f", "x11grab",
             "-framerate", settings["framerate"],
             "-video_size", settings["resolution"],
-            "-i", config.DISPLAY,
+            "-i", self._display,
 
             # Audio input (PulseAudio virtual sink monitor)
             "-f", "pulse",
             "-i", "virtual_speaker.monitor",
 
             # Video codec settings
-            "-c:v", "libx264",
-            "-preset", "veryfast",  # Faster encoding, good trade-off for size/cpu
-            "-tune", "zerolatency",  # Low latency
-            "-b:v", settings["video_bitrate"],
-            "-pix_fmt", "yuv420p",
+            *self._video_codec_args(hw_accel, settings),
 
             # Audio codec settings
             "-c:a", "aac",
@@ -64,18 +102,65 @@ class Recorder:
 
             # Output format options
             # movflags: Write moov atom at the start (faststart) and allow fragmented mp4
-            # This makes the file recoverable even if FFmpeg terminates abruptly
-            "-movflags", "+faststart+frag_keyframe+empty_moov",
+            # This makes the file recoverable even if FFmpeg terminates abruptly.
+            # A pipe can't be seeked, so faststart is dropped there; the empty moov +
+            # fragments already make the stream playable front to back
+            "-movflags", "+frag_keyframe+empty_moov" if to_pipe else "+faststart+frag_keyframe+empty_moov",
 
             # Output
             "-f", "mp4",
-            str(output_path)
         ]
 
-        return cmd
+        return tuple(cmd)
+
+    @staticmethod
+    def _resolve_hw_accel() -> str:
+        """Pick the video encoder backend from HW_ACCEL ("auto" probes for VAAPI)"""
+        hw_accel = config.HW_ACCEL.lower()
+        if hw_accel == "auto":
+            if shutil.which("vainfo") and os.path.exists(config.VAAPI_DEVICE):
+                return "vaapi"
+            return "none"
+        return hw_accel
+
+    @staticmethod
+    def _video_codec_args(hw_accel: str, settings) -> list:
+        """Video encoder arguments; libx264 is the fallback when no GPU encoder is set"""
+        if hw_accel == "vaapi":
+            return [
+                "-vf", "format=nv12,hwupload",  # Upload frames to the GPU surface
+                "-c:v", "h264_vaapi",
+                "-qp", "23",
+            ]
+        if hw_accel == "nvenc":
+            return [
+                "-c:v", "h264_nvenc",
+                "-preset", "p4",
+                "-rc", "vbr",
+                "-b:v", settings["video_bitrate"],
+                "-pix_fmt", "yuv420p",
+            ]
+        # No -tune zerolatency: the file is uploaded after the meeting, so keep
+        # B-frames and lookahead for better compression at the same bitrate
+        return [
+            "-c:v", "libx264",
+            "-preset", "veryfast",  # Faster encoding, good trade-off for size/cpu
+            "-g", str(int(settings["framerate"]) * 2),  # Keyframe (and mp4 fragment) every 2s
+            "-bf", "3",
+            "-refs", "3",
+            "-b:v", settings["video_bitrate"],
+            "-pix_fmt", "yuv420p",
+        ]
     
-    async def start(self) -> Path:
-        """Start recording"""
+    async def start(self, stream_factory: Optional[Callable[[Path], object]] = None) -> Path:
+        """
+        Start recording
+        
+        Args:
+            stream_factory: Optional callable returning a stream (with write/close)
+                for the output path. When given, FFmpeg writes to stdout and the
+                bytes are teed to the local file and the stream as they arrive.
+        """
         if self.is_recording:
             logger.warning("Recording already in progress")
             return self.recording_path
@@ -85,35 +170,69 @@ class Recorder:
         # Ensure directory exists
         self.recording_path.parent.mkdir(parents=True, exist_ok=True)
         
-        cmd = self._build_ffmpeg_command(self.recording_path)
-        logger.info(f"Starting FFmpeg recording: {' '.join(cmd)}")
+        to_pipe = stream_factory is not None
+        cmd = self._build_ffmpeg_command(self.recording_path, to_pipe=to_pipe)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Starting FFmpeg recording: %s", ' '.join(cmd))
         
         try:
-            # Use preexec_fn to ignore SIGINT in the FFmpeg process
-            # This is more reliable than start_new_session in Docker containers
-            self.process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-                stdin=asyncio.subprocess.PIPE,  # Need stdin to send 'q' command
-                start_new_session=True,  # Isolate FFmpeg from parent's signal group
+            # Plain Popen (spawned off the loop) so stderr can be drained with raw
+            # os.read calls in a thread, bypassing the asyncio transport machinery
+            loop = asyncio.get_running_loop()
+            self.process = await loop.run_in_executor(
+                None,
+                lambda: subprocess.Popen(
+                    cmd,
+                    stdout=subprocess.PIPE if to_pipe else subprocess.DEVNULL,
+                    stderr=subprocess.PIPE,
+                    stdin=subprocess.PIPE,  # Need stdin to send 'q' command
+                    start_new_session=True,  # Isolate FFmpeg from parent's signal group
+                ),
             )
 
             self.is_recording = True
             self.start_time = datetime.now()
+            self._start_monotonic = time.monotonic()
+
+            if to_pipe:
+                # Start pumping right away: the pipe buffer fills in well under a second
+                self.stream_upload = stream_factory(self.recording_path)
+                self._stdout_thread = threading.Thread(
+                    target=self._pump_stdout,
+                    args=(self.stream_upload,),
+                    name="ffmpeg-stdout",
+                    daemon=True,
+                )
+                self._stdout_thread.start()
 
             # Wait a moment and check if FFmpeg is still running
             await asyncio.sleep(1)
-            if self.process.returncode is not None:
+            if self.process.poll() is not None:
                 # FFmpeg failed to start, get error output
-                stderr = await self.process.stderr.read()
+                stderr = await asyncio.to_thread(self.process.stderr.read)
                 stderr_str = stderr.decode('utf-8', errors='ignore')
                 logger.error(f"FFmpeg failed to start (exit code {self.process.returncode}): {stderr_str[:500]}")
                 self.is_recording = False
+                
+                # Don't leave the multipart upload started for it open in R2
+                if self._stdout_thread:
+                    # FFmpeg has exited, so the pump hits EOF and closes the stream
+                    await asyncio.to_thread(self._stdout_thread.join, 10)
+                    self._stdout_thread = None
+                if self.stream_upload:
+                    await asyncio.to_thread(self.stream_upload.cancel, 10)
+                    self.stream_upload = None
+                
                 raise RuntimeError(f"FFmpeg failed to start: {stderr_str[:200]}")
 
-            # Start a task to monitor FFmpeg stderr for errors
-            self._stderr_task = asyncio.create_task(self._monitor_ffmpeg_stderr())
+            # Start a thread to monitor FFmpeg stderr for errors
+            self._stderr_thread = threading.Thread(
+                target=self._drain_stderr,
+                args=(loop,),
+                name="ffmpeg-stderr",
+                daemon=True,
+            )
+            self._stderr_thread.start()
 
             logger.info(f"Recording started successfully: {self.recording_path}")
             return self.recording_path
@@ -122,35 +241,76 @@ class Recorder:
             logger.error(f"Failed to start recording: {e}")
             raise
 
-    async def _monitor_ffmpeg_stderr(self):
-        """Monitor FFmpeg stderr for errors and log them"""
-        if not self.process or not self.process.stderr:
-            return
+    def _pump_stdout(self, stream):
+        """Pump thread: tee FFmpeg's piped output to the local file and the upload stream"""
+        fd = self.process.stdout.fileno()
+        try:
+            with open(self.recording_path, "wb") as f:
+                while True:
+                    buf = os.read(fd, STDOUT_READ_SIZE)
+                    if not buf:
+                        break
+                    f.write(buf)
+                    stream.write(buf)
+        except Exception as e:
+            logger.error(f"FFmpeg output pump failed: {e}")
+        finally:
+            stream.close()
+
+    def _drain_stderr(self, loop: asyncio.AbstractEventLoop):
+        """Reader thread: bulk-read FFmpeg stderr until EOF, logging errors on the loop"""
+        fd = self.process.stderr.fileno()
+        tail = b""
         try:
             while True:
-                line = await self.process.stderr.readline()
-                if not line:
+                buf = os.read(fd, STDERR_READ_SIZE)
+                if not buf:
                     break
-                line_str = line.decode('utf-8', errors='ignore').strip()
-                if line_str:
-                    # Only log errors and important messages
-                    if 'error' in line_str.lower() or 'failed' in line_str.lower():
-                        logger.error(f"[FFmpeg] {line_str}")
-                    elif 'warning' in line_str.lower():
-                        logger.warning(f"[FFmpeg] {line_str}")
+                # Keep the trailing partial line (bounded) for the next read
+                lines = STDERR_LINE_END.split(tail + buf)
+                tail = lines.pop()[-STDERR_TAIL_MAX:]
+                if self._has_notable_line(lines):
+                    loop.call_soon_threadsafe(self._log_ffmpeg_lines, lines)
+            if tail:
+                loop.call_soon_threadsafe(self._log_ffmpeg_lines, [tail])
         except Exception as e:
+            # Includes RuntimeError when the loop is already closed at shutdown
             logger.debug(f"FFmpeg stderr monitor ended: {e}")
+
+    @staticmethod
+    def _has_notable_line(lines: list) -> bool:
+        """Cheap bytes-level pre-check so most chunks never cross back to the loop"""
+        for line in lines:
+            lower = line.lower()
+            if b'error' in lower or b'failed' in lower or b'warning' in lower:
+                return True
+        return False
+
+    @staticmethod
+    def _log_ffmpeg_lines(lines: list):
+        """Log error/warning lines from a batch of raw FFmpeg stderr lines"""
+        for line in lines:
+            line_str = line.decode('utf-8', errors='ignore').strip()
+            if not line_str:
+                continue
+            # Only log errors and important messages
+            lower = line_str.lower()
+            if 'error' in lower or 'failed' in lower:
+                logger.error("[FFmpeg] %s", line_str)
+            elif 'warning' in lower:
+                logger.warning("[FFmpeg] %s", line_str)
     
     async def stop(self) -> Optional[Path]:
         """Stop recording gracefully"""
         # Log recording directory contents for debugging
-        try:
-            recording_dir = Path(config.RECORDING_DIR)
-            if recording_dir.exists():
-                files = list(recording_dir.glob("*.mp4"))
-                logger.info(f"Recording directory contents: {[f.name for f in files]}")
-        except Exception as e:
-            logger.debug(f"Could not list recording directory: {e}")
+        if logger.isEnabledFor(logging.DEBUG):
+            try:
+                recording_dir = self._recording_dir
+                if recording_dir.exists():
+                    files = list(recording_dir.glob("*.mp4"))
+                    logger.debug("Recording directory contents: %s", [f.name for f in files])
+            except Exception as e:
+                logger.debug(f"Could not list recording directory: {e}")
 
         if not self.is_recording or not self.process:
             logger.warning("No recording in progress")
@@ -164,23 +324,15 @@ class Recorder:
 
         logger.info("Stopping recording...")
 
-        process_alive = self.process.returncode is None
+        process_alive = self.process.poll() is None
 
         try:
-            # Cancel stderr monitor task
-            if hasattr(self, '_stderr_task') and self._stderr_task:
-                self._stderr_task.cancel()
-                try:
-                    await self._stderr_task
-                except asyncio.CancelledError:
-                    pass
-
             if process_alive:
                 # Method 1: Send 'q' via stdin (FFmpeg's graceful quit command)
                 try:
                     logger.info("Sending 'q' to FFmpeg for graceful stop...")
                     self.process.stdin.write(b'q')
-                    await self.process.stdin.drain()
+                    self.process.stdin.flush()
                 except Exception as e:
                     logger.warning(f"Could not send 'q' to FFmpeg: {e}")
                     # Method 2: Try SIGTERM (more graceful than SIGINT)
@@ -192,23 +344,31 @@ class Recorder:
 
                 # Wait for process to finish
                 try:
-                    await asyncio.wait_for(self.process.wait(), timeout=10)
+                    await asyncio.to_thread(self.process.wait, 10)
                     logger.info(f"FFmpeg exited with code: {self.process.returncode}")
-                except asyncio.TimeoutError:
+                except subprocess.TimeoutExpired:
                     logger.warning("FFmpeg didn't stop gracefully, killing...")
                     try:
                         self.process.kill()
-                        await self.process.wait()
+                        await asyncio.to_thread(self.process.wait)
                     except ProcessLookupError:
                         pass  # Already dead
             else:
                 logger.warning(f"FFmpeg process already terminated with code: {self.process.returncode}")
 
+            # stdout/stderr hit EOF once FFmpeg exits, so the reader threads finish on their own
+            if self._stdout_thread:
+                await asyncio.to_thread(self._stdout_thread.join, 10)
+                self._stdout_thread = None
+            if self._stderr_thread:
+                await asyncio.to_thread(self._stderr_thread.join, 2)
+                self._stderr_thread = None
+
             self.is_recording = False
 
             # Get duration
-            if self.start_time:
-                duration = (datetime.now() - self.start_time).total_seconds()
+            if self._start_monotonic:
+                duration = time.monotonic() - self._start_monotonic
                 logger.info(f"Recording stopped. Duration: {duration:.1f}s")
 
             # Wait a moment for file system to sync
@@ -227,15 +387,12 @@ class Recorder:
                 else:
                     logger.error(f"Recording file not found at: {self.recording_path}")
                     # Try to find any recording file in the directory
-                    recording_dir = Path(config.RECORDING_DIR)
-                    if recording_dir.exists():
-                        mp4_files = sorted(recording_dir.glob("*.mp4"), key=lambda f: f.stat().st_mtime, reverse=True)
-                        if mp4_files:
-                            latest = mp4_files[0]
-                            size = latest.stat().st_size
-                            if size > 0:
-                                logger.info(f"Found alternative recording: {latest} ({size / 1024 / 1024:.2f} MB)")
-                                return latest
+                    latest = self._find_latest_recording()
+                    if latest:
+                        path, size = latest
+                        if size > 0:
+                            logger.info(f"Found alternative recording: {path} ({size / 1024 / 1024:.2f} MB)")
+                            return path
             return None
 
         except Exception as e:
@@ -249,11 +406,26 @@ class Recorder:
                     return self.recording_path
             raise
     
+    def _find_latest_recording(self) -> Optional[tuple]:
+        """Return (path, size) of the newest .mp4 in the recording dir, in a single scandir pass"""
+        best = None
+        best_mtime = 0.0
+        try:
+            with os.scandir(self._recording_dir) as it:
+                for entry in it:
+                    if not entry.name.endswith(".mp4"):
+                        continue
+                    st = entry.stat()
+                    if best is None or st.st_mtime > best_mtime:
+                        best, best_mtime = (Path(entry.path), st.st_size), st.st_mtime
+        except FileNotFoundError:
+            return None
+        return best
+
     def get_duration_seconds(self) -> int:
         """Get current recording duration in seconds"""
-        if not self.start_time:
-            return 0
-        return int((datetime.now() - self.start_time).total_seconds())
+        # Monotonic clock: cheap, and immune to wall-clock (NTP) adjustments
+        return int(time.monotonic() - self._start_monotonic) if self._start_monotonic else 0
     
     async def is_max_duration_reached(self) -> bool:
         """Check if max duration has been reached"""
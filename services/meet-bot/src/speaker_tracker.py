@@ -3,23 +3,32 @@ Meet Bot - Speaker Tracker
 Monitors Google Meet UI to detect active speakers during recording
 """
 import asyncio
+import bisect
 import json
 import logging
+import sys
+import time
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Set
 
+import orjson
 from playwright.async_api import Page
 
 logger = logging.getLogger(__name__)
 
+# A new speaker must stay detected this long before it becomes an event, so
+# detection flaps (A -> B -> A within a moment) don't produce events
+MIN_SPEAKER_HOLD_MS = 1000
+
 
 class SpeakerEvent:
     """Represents a speaker change event"""
     def __init__(self, timestamp_ms: int, speaker_name: str, participants: List[str] = None):
         self.timestamp_ms = timestamp_ms
-        self.speaker_name = speaker_name
-        self.participants = participants or []
+        # Interned: a handful of names repeated across thousands of events
+        self.speaker_name = sys.intern(speaker_name)
+        self.participants = [sys.intern(p) for p in participants] if participants else []
     
     def to_dict(self) -> dict:
         return {
@@ -33,7 +42,7 @@ class SpeakerTracker:
     """
     Tracks active speakers during a Google Meet session.
     
-    Uses DOM monitoring to detect:
+    Uses DOM monitoring (a MutationObserver pushing changes into Python) to detect:
     - Who is currently speaking (via visual indicators)
     - All participant names
     """
@@ -41,16 +50,26 @@ class SpeakerTracker:
     def __init__(self, page: Page):
         self.page = page
         self.events: List[SpeakerEvent] = []
-        self.participants: List[str] = []
+        self._event_ts: List[int] = []  # timestamp_ms of each event, for bisect
+        self._participants: Set[str] = set()
         self.is_tracking = False
         self._tracking_task: Optional[asyncio.Task] = None
-        self.start_time: Optional[datetime] = None
-        self.polling_interval_ms = 1000  # Poll every 1 second
+        self.start_time: Optional[datetime] = None  # Wall clock, for recorded_at
+        self._start_ns = 0
+        # Speaker changes are pushed from the page by a MutationObserver; the
+        # watchdog only polls when no event arrived for this long, backing off
+        # (doubling up to the max) while polls find no change
+        self.watchdog_interval_s = 5
+        self.max_watchdog_interval_s = 40
+        self._last_speaker: Optional[str] = None
+        self._pending_event: Optional[SpeakerEvent] = None  # Candidate speaker change
+        self._last_event_at = 0.0
+        self._binding_installed = False
     
     # JavaScript function to detect active speaker in Google Meet
     # Conservative approach: only detect when we have strong evidence, never guess
     DETECT_SPEAKER_JS = """
-    () => {
+    async () => {
         const result = {
             activeSpeaker: null,
             participants: [],
@@ -58,87 +77,108 @@ class SpeakerTracker:
         };
         
         try {
-            // Get all participant tiles
-            const tiles = document.querySelectorAll('[data-participant-id]');
-            result.debugInfo.tileCount = tiles.length;
-            
-            // Collect participant names - ONLY from reliable sources
-            const names = new Set();
-            
             // Exclusion list - things that are NOT participant names
-            const excludedPatterns = [
-                'Bot', 'Meeting-Assistant', 'Você', 'You', 
-                'Ativar', 'Desativar', 'Mute', 'Unmute',
-                'camera', 'câmera', 'microphone', 'microfone',
-                'apresent', 'present', 'compart', 'share'
-            ];
+            // (one case-insensitive regex instead of a lowercase/includes scan per pattern)
+            const EXCLUDE_RE = /bot|meeting-assistant|você|you|ativar|desativar|mute|unmute|camera|câmera|microphone|microfone|apresent|present|compart|share/i;
             
-            const isValidName = (name) => {
-                if (!name || name.length < 3 || name.length > 60) return false;
-                if (/^[0-9:]+$/.test(name)) return false; // Timestamps
-                for (const pattern of excludedPatterns) {
-                    if (name.toLowerCase().includes(pattern.toLowerCase())) return false;
-                }
-                return true;
-            };
+            const isValidName = (name) =>
+                !!name && name.length >= 3 && name.length <= 60 &&
+                !/^[0-9:]+$/.test(name) && // Timestamps
+                !EXCLUDE_RE.test(name);
             
-            for (const tile of tiles) {
-                // PRIMARY SOURCE: data-self-name attribute - most reliable
-                const selfName = tile.getAttribute('data-self-name');
-                if (selfName && isValidName(selfName)) {
-                    names.add(selfName);
+            // Participant tiles and their names are cached on window and only
+            // re-queried after tiles are added/removed or renamed
+            let cache = window.__rkjTileCache;
+            if (!cache) {
+                cache = window.__rkjTileCache = { gen: 0, tiles: null, names: null, participants: null };
+                const TILE = '[data-participant-id]';
+                const touchesTile = (node) => node instanceof Element &&
+                    (node.matches(TILE) || node.querySelector(TILE) !== null);
+                new MutationObserver((mutations) => {
+                    // Ignore unrelated churn (e.g. caption text) so the cache survives it
+                    const changed = mutations.some(m => m.type === 'attributes' ||
+                        [...m.addedNodes].some(touchesTile) ||
+                        [...m.removedNodes].some(touchesTile));
+                    if (changed) {
+                        cache.gen++;
+                        cache.tiles = null;
+                    }
+                }).observe(document.body, {
+                    childList: true,
+                    subtree: true,
+                    attributes: true,
+                    attributeFilter: ['data-participant-id', 'data-self-name']
+                });
+            }
+            if (!cache.tiles) {
+                cache.tiles = document.querySelectorAll('[data-participant-id]');
+                // tile -> valid name (PRIMARY SOURCE: data-self-name attribute - most reliable)
+                cache.names = new Map();
+                const names = new Set();
+                for (const tile of cache.tiles) {
+                    const selfName = tile.getAttribute('data-self-name');
+                    if (selfName && isValidName(selfName)) {
+                        cache.names.set(tile, selfName);
+                        names.add(selfName);
+                    }
                 }
+                cache.participants = [...names];
             }
+            const tiles = cache.tiles;
+            result.debugInfo.tileCount = tiles.length;
+            result.debugInfo.cacheGen = cache.gen;
             
-            result.participants = [...names];
-            result.debugInfo.participantCount = names.size;
+            result.participants = cache.participants;
+            result.debugInfo.participantCount = cache.participants.length;
             
             // SPEAKER DETECTION - Only when we have real evidence
             // DO NOT use fallback - it's better to have no speaker than wrong speaker
             
-            // Strategy 1: Look for data-is-speaking attribute (if Google uses it)
-            const speakingElements = document.querySelectorAll('[data-is-speaking="true"]');
+            // Strategy 1: data-is-speaking attribute (if Google uses it)
+            // Strategy 2: speaking indicator in aria-label
+            // Both come from one query; a data-is-speaking match wins over aria-label
+            const speakingElements = document.querySelectorAll(
+                '[data-is-speaking="true"], ' +
+                '[aria-label*="está falando"], [aria-label*="is speaking"], ' +
+                '[aria-label*="is talking"], [aria-label*="está a falar"]'
+            );
             for (const el of speakingElements) {
                 const tile = el.closest('[data-participant-id]');
-                if (tile) {
-                    const name = tile.getAttribute('data-self-name');
-                    if (name && isValidName(name)) {
-                        result.activeSpeaker = name;
-                        result.debugInfo.detectionMethod = 'data-is-speaking';
-                        break;
-                    }
+                const name = tile && cache.names.get(tile);
+                if (!name) continue;
+                
+                if (el.getAttribute('data-is-speaking') === 'true') {
+                    result.activeSpeaker = name;
+                    result.debugInfo.detectionMethod = 'data-is-speaking';
+                    break;
                 }
-            }
-            
-            // Strategy 2: Check for speaking indicator in aria-label
-            if (!result.activeSpeaker) {
-                const speakingIndicators = document.querySelectorAll(
-                    '[aria-label*="está falando"], [aria-label*="is speaking"], ' +
-                    '[aria-label*="is talking"], [aria-label*="está a falar"]'
-                );
-                for (const indicator of speakingIndicators) {
-                    const tile = indicator.closest('[data-participant-id]');
-                    if (tile) {
-                        const name = tile.getAttribute('data-self-name');
-                        if (name && isValidName(name)) {
-                            result.activeSpeaker = name;
-                            result.debugInfo.detectionMethod = 'aria-speaking';
-                            break;
-                        }
-                    }
+                if (!result.activeSpeaker) {
+                    result.activeSpeaker = name;
+                    result.debugInfo.detectionMethod = 'aria-speaking';
                 }
             }
             
             // Strategy 3: Large tile in speaker view (only if SINGLE large tile)
+            // Only reached when 1/2 found nothing. Geometry is read in one batch at
+            // the next frame (layout is forced once, not per tile); the timeout
+            // covers pages where rAF is throttled
             if (!result.activeSpeaker) {
-                const largeTiles = [...tiles].filter(tile => {
-                    const rect = tile.getBoundingClientRect();
-                    return rect.width > 800 && rect.height > 500;
-                });
+                await new Promise(r => { requestAnimationFrame(r); setTimeout(r, 100); });
+                
+                const sizes = new Float32Array(tiles.length * 2);
+                for (let i = 0; i < tiles.length; i++) {
+                    const rect = tiles[i].getBoundingClientRect();
+                    sizes[2 * i] = rect.width;
+                    sizes[2 * i + 1] = rect.height;
+                }
+                const largeTiles = [];
+                for (let i = 0; i < tiles.length; i++) {
+                    if (sizes[2 * i] > 800 && sizes[2 * i + 1] > 500) largeTiles.push(tiles[i]);
+                }
                 
                 if (largeTiles.length === 1) {
-                    const name = largeTiles[0].getAttribute('data-self-name');
-                    if (name && isValidName(name)) {
+                    const name = cache.names.get(largeTiles[0]);
+                    if (name) {
                         result.activeSpeaker = name;
                         result.debugInfo.detectionMethod = 'speaker-view';
                     }
@@ -156,6 +196,47 @@ class SpeakerTracker:
     }
     """
     
+    # Installs one MutationObserver that re-runs the detector when a tile's speaking
+    # attributes change and pushes the result to Python (only on a speaker change)
+    INSTALL_OBSERVER_JS = """
+    () => {
+        if (window.__rkjSpeakerObserver) return false;
+        
+        const detect = """ + DETECT_SPEAKER_JS + """;
+        let lastSpeaker = null;
+        
+        const observer = new MutationObserver(async (mutations) => {
+            const relevant = mutations.some(m =>
+                m.target instanceof Element && m.target.closest('[data-participant-id]')
+            );
+            if (!relevant) return;
+            
+            const result = await detect();
+            if (result.activeSpeaker && result.activeSpeaker !== lastSpeaker) {
+                lastSpeaker = result.activeSpeaker;
+                window.rkj_on_speaker(result);
+            }
+        });
+        
+        observer.observe(document.body, {
+            attributes: true,
+            subtree: true,
+            attributeFilter: ['data-is-speaking', 'aria-label', 'data-self-name']
+        });
+        window.__rkjSpeakerObserver = observer;
+        return true;
+    }
+    """
+    
+    UNINSTALL_OBSERVER_JS = """
+    () => {
+        if (window.__rkjSpeakerObserver) {
+            window.__rkjSpeakerObserver.disconnect();
+            delete window.__rkjSpeakerObserver;
+        }
+    }
+    """
+    
     async def start_tracking(self):
         """Start tracking speakers"""
         if self.is_tracking:
@@ -165,47 +246,104 @@ class SpeakerTracker:
         logger.info("Starting speaker tracking...")
         self.is_tracking = True
         self.start_time = datetime.now()
+        self._start_ns = time.monotonic_ns()
         self.events = []
+        self._event_ts = []
+        
+        self._last_speaker = None
+        self._pending_event = None
+        self._last_event_at = time.monotonic()
         
-        # Start background polling task
+        # Push speaker changes from the page instead of polling every second
+        try:
+            if not self._binding_installed:
+                await self.page.expose_binding("rkj_on_speaker", self._on_speaker_event)
+                self._binding_installed = True
+            await self.page.evaluate(self.INSTALL_OBSERVER_JS)
+        except Exception as e:
+            logger.warning(f"Could not install speaker observer, relying on polling: {e}")
+        
+        # Background watchdog (polls only while no events arrive)
         self._tracking_task = asyncio.create_task(self._tracking_loop())
     
+    def _on_speaker_event(self, source, result: Dict[str, Any]):
+        """Binding called by the page's MutationObserver on a speaker change"""
+        if not self.is_tracking:
+            return
+        self._last_event_at = time.monotonic()
+        self._handle_detection(result)
+    
+    def _handle_detection(self, result: Dict[str, Any]) -> bool:
+        """Record a detection result (from the observer or the watchdog); True on a speaker change"""
+        elapsed_ms = self._elapsed_ms()
+        
+        # Intern names at the JS boundary so comparisons below are identity checks
+        active_speaker = result.get("activeSpeaker")
+        if active_speaker:
+            active_speaker = sys.intern(active_speaker)
+        participants = [sys.intern(p) for p in result.get("participants", [])]
+        debug_info = result.get("debugInfo", {})
+        
+        # Update participant list
+        self._participants.update(participants)
+        
+        changed = active_speaker is not None and active_speaker is not self._last_speaker
+        if active_speaker:
+            self._propose_speaker(active_speaker, participants, elapsed_ms)
+        
+        # Debug logging (less frequent)
+        if len(self.events) % 10 == 1:
+            logger.debug(
+                "Speaker tracking: %d events, %d participants, method: %s",
+                len(self.events), len(self._participants), debug_info.get('detectionMethod', 'none')
+            )
+        
+        return changed
+    
+    def _propose_speaker(self, speaker: str, participants: List[str], elapsed_ms: int):
+        """Coalesce detections: a speaker change is only emitted once it has held"""
+        pending = self._pending_event
+        if pending is not None and elapsed_ms - pending.timestamp_ms >= MIN_SPEAKER_HOLD_MS:
+            self._emit_event(pending)  # Held long enough: a real turn
+            pending = self._pending_event = None
+        
+        if speaker is self._last_speaker:
+            self._pending_event = None  # Back to the current speaker: the candidate was a flap
+        elif pending is None or pending.speaker_name is not speaker:
+            self._pending_event = SpeakerEvent(elapsed_ms, speaker, participants)
+    
+    def _emit_event(self, event: SpeakerEvent):
+        logger.info("[Speaker] %s started speaking at %dms", event.speaker_name, event.timestamp_ms)
+        self.events.append(event)
+        self._event_ts.append(event.timestamp_ms)
+        self._last_speaker = event.speaker_name
+    
+    def _elapsed_ms(self) -> int:
+        # Monotonic integer clock: no datetime allocations, immune to NTP jumps
+        return (time.monotonic_ns() - self._start_ns) // 1_000_000
+    
     async def _tracking_loop(self):
-        """Background loop that polls for active speaker"""
-        last_speaker = None
+        """Watchdog: poll for the active speaker only when the observer has been quiet"""
+        idle_ticks = 0
         
         while self.is_tracking:
+            interval = min(
+                self.max_watchdog_interval_s,
+                self.watchdog_interval_s * (2 ** min(idle_ticks, 3))
+            )
+            await asyncio.sleep(interval)
+            
+            if time.monotonic() - self._last_event_at < interval:
+                idle_ticks = 0  # The observer is delivering; back to the base interval
+                continue
+            
             try:
-                # Get current elapsed time
-                elapsed_ms = int((datetime.now() - self.start_time).total_seconds() * 1000)
-                
-                # Detect active speaker via JavaScript
+                # Also re-installs the observer if the page lost it (no-op otherwise)
+                await self.page.evaluate(self.INSTALL_OBSERVER_JS)
                 result = await self.page.evaluate(self.DETECT_SPEAKER_JS)
-                
-                active_speaker = result.get("activeSpeaker")
-                participants = result.get("participants", [])
-                debug_info = result.get("debugInfo", {})
-                
-                # Update participant list
-                if participants:
-                    self.participants = list(set(self.participants + participants))
-                
-                # Log speaker change
-                if active_speaker and active_speaker != last_speaker:
-                    logger.info(f"[Speaker] {active_speaker} started speaking at {elapsed_ms}ms")
-                    event = SpeakerEvent(elapsed_ms, active_speaker, participants)
-                    self.events.append(event)
-                    last_speaker = active_speaker
-                
-                # Debug logging (less frequent)
-                if len(self.events) % 10 == 1:
-                    logger.debug(f"Speaker tracking: {len(self.events)} events, {len(self.participants)} participants, method: {debug_info.get('detectionMethod', 'none')}")
-                
+                idle_ticks = 0 if self._handle_detection(result) else idle_ticks + 1
             except Exception as e:
-                logger.debug(f"Speaker detection error: {e}")
-            
-            # Wait for next poll
-            await asyncio.sleep(self.polling_interval_ms / 1000)
+                logger.debug("Speaker detection error: %s", e)
     
     async def stop_tracking(self) -> List[SpeakerEvent]:
         """Stop tracking and return events"""
@@ -219,39 +357,54 @@ class SpeakerTracker:
             except asyncio.CancelledError:
                 pass
         
-        logger.info(f"Speaker tracking complete: {len(self.events)} events, {len(self.participants)} participants")
+        try:
+            await self.page.evaluate(self.UNINSTALL_OBSERVER_JS)
+        except Exception as e:
+            logger.debug("Could not remove speaker observer: %s", e)
+        
+        # The last candidate was never contradicted; keep it if it held
+        pending = self._pending_event
+        if pending is not None and self._elapsed_ms() - pending.timestamp_ms >= MIN_SPEAKER_HOLD_MS:
+            self._emit_event(pending)
+        self._pending_event = None
+        
+        logger.info(f"Speaker tracking complete: {len(self.events)} events, {len(self._participants)} participants")
         return self.events
     
     def get_participants(self) -> List[str]:
         """Get list of all participants detected"""
-        return self.participants
+        return sorted(self._participants)
     
     def get_speaker_at_time(self, timestamp_ms: int) -> Optional[str]:
         """Get the speaker who was active at a given timestamp"""
-        speaker = None
-        for event in self.events:
-            if event.timestamp_ms <= timestamp_ms:
-                speaker = event.speaker_name
-            else:
-                break
-        return speaker
+        # Events are appended in increasing timestamp order
+        i = bisect.bisect_right(self._event_ts, timestamp_ms) - 1
+        return self.events[i].speaker_name if i >= 0 else None
     
     def save_events(self, output_path: Path) -> Path:
         """Save speaker events to JSON file"""
+        # SpeakerEvent.__dict__ already has the to_dict() shape, so events are
+        # serialized without building a dict per event
         data = {
-            "participants": self.participants,
-            "events": [e.to_dict() for e in self.events],
+            "participants": sorted(self._participants),
+            "events": [e.__dict__ for e in self._coalesced_events()],
             "recorded_at": self.start_time.isoformat() if self.start_time else None
         }
         
         output_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        with open(output_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        output_path.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2))
         
         logger.info(f"Speaker events saved: {output_path}")
         return output_path
     
+    def _coalesced_events(self):
+        """Events without back-to-back repeats of the same speaker"""
+        previous = None
+        for event in self.events:
+            if event.speaker_name != previous:
+                yield event
+                previous = event.speaker_name
+    
     @classmethod
     def load_events(cls, input_path: Path) -> tuple[List[str], List[SpeakerEvent]]:
         """Load speaker events from JSON file"""
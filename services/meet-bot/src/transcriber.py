@@ -3,15 +3,16 @@ Meet Bot - Transcriber
 Transcribes audio using OpenAI Whisper API with timestamp formatting
 """
 import asyncio
+import functools
 import logging
 import os
+import re
 import tempfile
-from datetime import timedelta
 from pathlib import Path
 from typing import Optional
 
+import numpy as np
 from openai import OpenAI
-from pydub import AudioSegment
 
 from .config import config
 
@@ -20,24 +21,126 @@ logger = logging.getLogger(__name__)
 # OpenAI Whisper limits
 MAX_FILE_SIZE_MB = 25
 MAX_FILE_SIZE_BYTES = MAX_FILE_SIZE_MB * 1024 * 1024
+# Chunks of a large file transcribed at once (bounded by OpenAI rate limits)
+MAX_CONCURRENT_CHUNKS = 4
+
+# Caption timestamps may not align perfectly with Whisper timestamps
+SPEAKER_TIME_TOLERANCE_MS = 5000  # 5 second tolerance window
+
+_WORD_RE = re.compile(r"\S+")
+
+
+def _speakers_at_times(caption_segments: Optional[list], timestamps_ms: list) -> list:
+    """
+    Speaker most likely active at each timestamp, from live caption segments
+    
+    A timestamp inside a segment gets that segment's speaker; otherwise the closest
+    segment within SPEAKER_TIME_TOLERANCE_MS; otherwise the most recent speaker
+    before it (None if there is none).
+    """
+    if not caption_segments or not timestamps_ms:
+        return [None] * len(timestamps_ms)
+    
+    ordered = sorted(caption_segments, key=lambda seg: seg.start_ms)
+    names = np.array([seg.speaker for seg in ordered], dtype=object)
+    starts = np.fromiter((seg.start_ms for seg in ordered), np.int64, len(ordered))
+    ends = np.fromiter((seg.end_ms for seg in ordered), np.int64, len(ordered))
+    
+    # Running max end among segments started so far, and which segment holds it
+    max_end = np.maximum.accumulate(ends)
+    positions = np.arange(len(ordered))
+    max_end_idx = np.maximum.accumulate(np.where(ends == max_end, positions, 0))
+    
+    t = np.asarray(timestamps_ms, dtype=np.int64)
+    # Last segment starting at or before each timestamp (-1 if none)
+    i = np.searchsorted(starts, t, side="right") - 1
+    has_prev = i >= 0
+    has_next = i + 1 < len(ordered)
+    prev = np.where(has_prev, i, 0)
+    nxt = np.where(has_next, i + 1, 0)
+    
+    before = np.where(has_prev, t - max_end[prev], SPEAKER_TIME_TOLERANCE_MS)
+    after = np.where(has_next, starts[nxt] - t, SPEAKER_TIME_TOLERANCE_MS)
+    
+    pick = np.full(len(t), -1, dtype=np.int64)
+    # Fallback: most recent segment before the timestamp
+    pick = np.where(has_prev, prev, pick)
+    # Closest within tolerance (the segment that ended last, or the next to start)
+    pick = np.where(before < SPEAKER_TIME_TOLERANCE_MS, max_end_idx[prev], pick)
+    pick = np.where(after < np.minimum(before, SPEAKER_TIME_TOLERANCE_MS), nxt, pick)
+    # Direct match: the timestamp falls within a segment
+    pick = np.where(has_prev & (max_end[prev] >= t), max_end_idx[prev], pick)
+    
+    return [names[p] if p >= 0 else None for p in pick.tolist()]
+
+
+@functools.cache
+def _openai_client(api_key: str) -> OpenAI:
+    """Shared OpenAI client (one connection pool per process)"""
+    return OpenAI(api_key=api_key)
+
+
+def _count_words(text: str) -> int:
+    """Number of whitespace-separated words, without building the word list"""
+    return sum(1 for _ in _WORD_RE.finditer(text))
+
+
+@functools.lru_cache(maxsize=4096)
+def _fmt_ts(sec: int) -> str:
+    """HH:MM:SS for a whole number of seconds (hours may exceed 24)"""
+    hours, remainder = divmod(sec, 3600)
+    minutes, secs = divmod(remainder, 60)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}"
+
+
+async def _run_ffmpeg_tool(*args: str) -> bytes:
+    """Run ffmpeg/ffprobe without blocking the event loop and return its stdout"""
+    process = await asyncio.create_subprocess_exec(
+        *args,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    stdout, stderr = await process.communicate()
+    if process.returncode != 0:
+        raise RuntimeError(f"{args[0]} failed: {stderr.decode(errors='replace').strip()}")
+    return stdout
+
+
+async def _probe_duration_ms(file_path: str) -> int:
+    """Duration of a media file in milliseconds (via ffprobe)"""
+    stdout = await _run_ffmpeg_tool(
+        "ffprobe", "-v", "error",
+        "-show_entries", "format=duration",
+        "-of", "default=noprint_wrappers=1:nokey=1",
+        file_path
+    )
+    return int(float(stdout) * 1000)
+
+
+async def _extract_audio_chunk(file_path: str, chunk_path: str, start_ms: int, end_ms: int):
+    """Encode [start_ms, end_ms) of a file's audio to mp3"""
+    await _run_ffmpeg_tool(
+        "ffmpeg", "-y", "-v", "error",
+        "-ss", f"{start_ms / 1000:.3f}",
+        "-i", file_path,
+        "-t", f"{(end_ms - start_ms) / 1000:.3f}",
+        "-vn",
+        "-c:a", "libmp3lame", "-b:a", "64k",
+        chunk_path
+    )
 
 
 class Transcriber:
     """Handles audio transcription using OpenAI Whisper API"""
     
     def __init__(self):
-        self.client = OpenAI(api_key=config.OPENAI_API_KEY)
+        self.client = _openai_client(config.OPENAI_API_KEY)
         self.model = config.OPENAI_WHISPER_MODEL
         self.language = config.TRANSCRIPTION_LANGUAGE
     
     def _format_timestamp(self, seconds: float) -> str:
         """Format seconds to HH:MM:SS"""
-        td = timedelta(seconds=int(seconds))
-        hours, remainder = divmod(td.seconds, 3600)
-        minutes, secs = divmod(remainder, 60)
-        if td.days > 0:
-            hours += td.days * 24
-        return f"{hours:02d}:{minutes:02d}:{secs:02d}"
+        return _fmt_ts(int(seconds))
     
     def transcribe_file(self, file_path: str) -> dict:
         """Transcribe a single audio/video file using OpenAI Whisper API"""
@@ -48,15 +151,25 @@ class Transcriber:
                 model=self.model,
                 file=audio_file,
                 language=self.language,
-                response_format="verbose_json"
+                response_format="verbose_json",
+                timestamp_granularities=["segment"]
             )
         
-        return response.model_dump()
+        # Keep only what is used downstream (no tokens/logprobs per segment)
+        data = response.model_dump()
+        return {
+            "text": data.get("text", ""),
+            "language": data.get("language"),
+            "segments": [
+                {"start": seg["start"], "end": seg["end"], "text": seg["text"]}
+                for seg in data.get("segments") or []
+            ]
+        }
     
     async def transcribe_large_file(self, file_path: str) -> dict:
         """Transcribe a large file by splitting into chunks"""
-        audio = AudioSegment.from_file(file_path)
-        total_duration_ms = len(audio)
+        # Only the duration is needed up front; the file is never decoded in full
+        total_duration_ms = await _probe_duration_ms(file_path)
         file_size = os.path.getsize(file_path)
         bytes_per_ms = file_size / total_duration_ms
         
@@ -78,35 +191,45 @@ class Transcriber:
         
         logger.info(f"Processing {len(chunks)} chunks")
         
-        all_segments = []
-        full_text_parts = []
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_CHUNKS)
         
-        for i, (start_ms, end_ms) in enumerate(chunks):
-            logger.info(f"Processing chunk {i + 1}/{len(chunks)}")
-            
-            # Extract chunk
-            chunk_audio = audio[start_ms:end_ms]
-            
-            with tempfile.NamedTemporaryFile(suffix=".mp3", delete=False) as tmp:
-                chunk_path = tmp.name
-            
-            try:
-                chunk_audio.export(chunk_path, format="mp3")
+        async def process_chunk(i: int, start_ms: int, end_ms: int, chunk_dir: str) -> dict:
+            # Chunks are independent Whisper calls, so several run at once
+            async with semaphore:
+                logger.info(f"Processing chunk {i + 1}/{len(chunks)}")
                 
-                # Transcribe chunk
-                result = self.transcribe_file(chunk_path)
+                chunk_path = os.path.join(chunk_dir, f"chunk_{i}.mp3")
                 
-                # Adjust timestamps
-                for segment in result.get("segments", []):
-                    segment["start"] += start_ms / 1000
-                    segment["end"] += start_ms / 1000
-                    all_segments.append(segment)
-                
-                full_text_parts.append(result.get("text", ""))
-                
-            finally:
-                if os.path.exists(chunk_path):
-                    os.unlink(chunk_path)
+                try:
+                    # Extract chunk (FFmpeg seeks to it instead of decoding from the start)
+                    await _extract_audio_chunk(file_path, chunk_path, start_ms, end_ms)
+                    
+                    # Transcribe chunk (the SDK is blocking)
+                    result = await asyncio.to_thread(self.transcribe_file, chunk_path)
+                    
+                    # Adjust timestamps
+                    for segment in result.get("segments", []):
+                        segment["start"] += start_ms / 1000
+                        segment["end"] += start_ms / 1000
+                    
+                    return result
+                    
+                finally:
+                    # Free disk as we go; the directory itself is removed at the end
+                    if os.path.exists(chunk_path):
+                        os.unlink(chunk_path)
+        
+        # One directory for all chunks, removed even if a chunk fails
+        with tempfile.TemporaryDirectory(prefix="transcribe_") as chunk_dir:
+            results = await asyncio.gather(*(
+                process_chunk(i, start_ms, end_ms, chunk_dir)
+                for i, (start_ms, end_ms) in enumerate(chunks)
+            ))
+        
+        # gather keeps chunk order for the text; segments are ordered by time
+        all_segments = [segment for result in results for segment in result.get("segments", [])]
+        all_segments.sort(key=lambda segment: segment["start"])
+        full_text_parts = [result.get("text", "") for result in results]
         
         return {
             "text": " ".join(full_text_parts),
@@ -127,7 +250,7 @@ class Transcriber:
             caption_segments: Optional list of CaptionSegment objects from live captions
             
         Returns:
-            dict with 'text', 'segments', 'formatted', and optionally 'speakers' keys
+            dict with 'text', 'segments', 'formatted' (list of lines), and optionally 'speakers' keys
         """
         logger.info(f"Starting transcription for: {recording_path}")
         
@@ -143,43 +266,8 @@ class Transcriber:
             logger.info(f"File too large ({file_size_mb:.2f}MB), splitting...")
             result = await self.transcribe_large_file(str(recording_path))
         else:
-            result = self.transcribe_file(str(recording_path))
-        
-        # Build speaker lookup from caption segments with time tolerance
-        # Caption timestamps may not align perfectly with Whisper timestamps
-        TIME_TOLERANCE_MS = 5000  # 5 second tolerance window
-        
-        def get_speaker_at_time(timestamp_ms: int) -> str:
-            """Get the speaker who was most likely active at a given timestamp"""
-            if not caption_segments:
-                return None
-            
-            best_match = None
-            best_score = float('inf')
-            
-            for seg in caption_segments:
-                # Check if timestamp falls within segment
-                if seg.start_ms <= timestamp_ms <= seg.end_ms:
-                    return seg.speaker  # Direct match
-                
-                # Calculate distance to segment
-                if timestamp_ms < seg.start_ms:
-                    distance = seg.start_ms - timestamp_ms
-                else:
-                    distance = timestamp_ms - seg.end_ms
-                
-                # Keep track of closest segment within tolerance
-                if distance < TIME_TOLERANCE_MS and distance < best_score:
-                    best_score = distance
-                    best_match = seg.speaker
-            
-            # If no match within tolerance, use the most recent speaker before this time
-            if not best_match:
-                for seg in reversed(caption_segments):
-                    if seg.end_ms <= timestamp_ms + TIME_TOLERANCE_MS:
-                        return seg.speaker
-            
-            return best_match
+            # The OpenAI SDK blocks; keep the event loop free while it runs
+            result = await asyncio.to_thread(self.transcribe_file, str(recording_path))
         
         # Format transcription with timestamps and speakers
         formatted_lines = []
@@ -190,35 +278,88 @@ class Transcriber:
             for seg in caption_segments:
                 speakers_found.add(seg.speaker)
         
-        for segment in result.get("segments", []):
+        # Resolve every segment's speaker in one vectorized pass
+        segments = result.get("segments", [])
+        speakers = _speakers_at_times(
+            caption_segments,
+            [int(segment.get("start", 0) * 1000) for segment in segments]
+        )
+        
+        for segment, speaker in zip(segments, speakers, strict=True):
             start_time_sec = segment.get("start", 0)
-            start_time_ms = int(start_time_sec * 1000)
             timestamp_str = self._format_timestamp(start_time_sec)
             text = segment.get("text", "").strip()
             
             if text:
-                speaker = get_speaker_at_time(start_time_ms)
                 if speaker:
                     formatted_lines.append(f"[{timestamp_str}] [{speaker}] {text}")
                     segment["speaker"] = speaker  # Add to segment data
                 else:
                     formatted_lines.append(f"[{timestamp_str}] {text}")
         
-        result["formatted"] = "\n".join(formatted_lines)
+        # Kept as lines; render_transcription writes them straight into the output
+        result["formatted"] = formatted_lines
         result["speakers"] = list(speakers_found)
         
-        word_count = len(result.get("text", "").split())
+        # Counted once here; render_transcription reuses it
+        word_count = result["word_count"] = _count_words(result.get("text", ""))
         speaker_count = len(speakers_found)
         logger.info(f"Transcription completed: {word_count} words, {len(result.get('segments', []))} segments, {speaker_count} speakers identified")
         
         return result
     
+    def render_transcription(self, result: dict, include_full_text: bool = True) -> bytes:
+        """
+        Serialize a transcription result to the UTF-8 text file format
+        
+        Args:
+            result: Transcription result from transcribe_audio
+            include_full_text: Whether to include full text at the end
+            
+        Returns:
+            Encoded file contents, ready to be written or uploaded
+        """
+        parts = []
+        
+        # Header
+        parts.append("=" * 60 + "\n")
+        parts.append("TRANSCRIPTION\n")
+        parts.append(f"Language: {result.get('language', 'unknown')}\n")
+        word_count = result.get("word_count")
+        if word_count is None:
+            word_count = _count_words(result.get("text", ""))
+        parts.append(f"Words: {word_count}\n")
+        
+        # Speakers list
+        speakers = result.get("speakers", [])
+        if speakers:
+            parts.append(f"Speakers: {', '.join(speakers)}\n")
+        
+        parts.append("=" * 60 + "\n\n")
+        
+        # Timestamped segments
+        for i, line in enumerate(result.get("formatted", [])):
+            if i:
+                parts.append("\n")
+            parts.append(line)
+        
+        # Full text at end (optional)
+        if include_full_text:
+            parts.append("\n\n")
+            parts.append("=" * 60 + "\n")
+            parts.append("FULL TEXT\n")
+            parts.append("=" * 60 + "\n\n")
+            parts.append(result.get("text", ""))
+        
+        return "".join(parts).encode("utf-8")
+    
     def save_transcription_file(
         self, 
         result: dict, 
         output_path: Path,
-        include_full_text: bool = True
-    ) -> Path:
+        include_full_text: bool = True,
+        data: Optional[bytes] = None
+    ) -> tuple[Path, bytes]:
         """
         Save transcription to a text file
         
@@ -226,39 +367,19 @@ class Transcriber:
             result: Transcription result from transcribe_audio
             output_path: Where to save the file
             include_full_text: Whether to include full text at the end
+            data: Already rendered contents (from render_transcription), if available
             
         Returns:
-            Path to the saved file
+            Path to the saved file and the bytes written, so callers can upload
+            them without reading the file back
         """
         logger.info(f"Saving transcription to: {output_path}")
         
-        output_path.parent.mkdir(parents=True, exist_ok=True)
+        if data is None:
+            data = self.render_transcription(result, include_full_text)
         
-        with open(output_path, "w", encoding="utf-8") as f:
-            # Header
-            f.write("=" * 60 + "\n")
-            f.write("TRANSCRIPTION\n")
-            f.write(f"Language: {result.get('language', 'unknown')}\n")
-            word_count = len(result.get("text", "").split())
-            f.write(f"Words: {word_count}\n")
-            
-            # Speakers list
-            speakers = result.get("speakers", [])
-            if speakers:
-                f.write(f"Speakers: {', '.join(speakers)}\n")
-            
-            f.write("=" * 60 + "\n\n")
-            
-            # Timestamped segments
-            f.write(result.get("formatted", ""))
-            
-            # Full text at end (optional)
-            if include_full_text:
-                f.write("\n\n")
-                f.write("=" * 60 + "\n")
-                f.write("FULL TEXT\n")
-                f.write("=" * 60 + "\n\n")
-                f.write(result.get("text", ""))
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        output_path.write_bytes(data)
         
         logger.info(f"Transcription saved: {output_path}")
-        return output_path
+        return output_path, data
@@ -2,33 +2,205 @@
 Meet Bot - R2 Uploader
 Uploads recordings to Cloudflare R2
 """
+import asyncio
+import functools
+import io
 import logging
+import queue
+import threading
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Union
 
 import boto3
+from boto3.s3.transfer import TransferConfig
 from botocore.config import Config as BotoConfig
 
 from .config import config
 
 logger = logging.getLogger(__name__)
 
+# R2 requires every multipart part except the last to have the same size
+MULTIPART_PART_SIZE = 8 * 1024 * 1024
+
+# Whole-file uploads: same part size, parts sent concurrently
+TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=MULTIPART_PART_SIZE,
+    multipart_chunksize=MULTIPART_PART_SIZE,
+    max_concurrency=10,
+    use_threads=True
+)
+
+
+@functools.cache
+def _r2_client(account_id: str, access_key_id: str, secret_access_key: str):
+    """Shared S3 client for R2 (building one loads endpoint data and signers)"""
+    return boto3.client(
+        "s3",
+        endpoint_url=f"https://{account_id}.r2.cloudflarestorage.com",
+        aws_access_key_id=access_key_id,
+        aws_secret_access_key=secret_access_key,
+        # Room for the concurrent multipart transfers (default pool is 10)
+        config=BotoConfig(signature_version="s3v4", max_pool_connections=20),
+        region_name="auto"
+    )
+
+
+class MultipartStreamUpload:
+    """
+    Uploads a file to R2 in fixed-size multipart parts while it is still being written.
+    
+    The multipart session is created as soon as the stream is opened (at recording
+    start). write() is called from the producer thread (the FFmpeg stdout pump) and
+    only slices the buffer and enqueues parts; a dedicated thread issues upload_part so
+    the producer never waits on the network. If any part fails the stream is marked
+    as failed and the caller falls back to a regular upload of the local file.
+    """
+    
+    def __init__(self, client, bucket: str, key: str, content_type: str):
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.content_type = content_type
+        
+        self.upload_id: Optional[str] = None
+        self.error: Optional[Exception] = None
+        self.bytes_uploaded = 0
+        
+        self._buffer = bytearray()
+        self._parts: list = []
+        self._queue: queue.Queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="r2-multipart", daemon=True)
+        self._thread.start()
+    
+    def write(self, data: bytes):
+        """Buffer data and enqueue every complete part"""
+        self._buffer += data
+        while len(self._buffer) >= MULTIPART_PART_SIZE:
+            self._queue.put(bytes(self._buffer[:MULTIPART_PART_SIZE]))
+            del self._buffer[:MULTIPART_PART_SIZE]
+    
+    def close(self):
+        """Enqueue the final (short) part and signal end of stream"""
+        if self._buffer:
+            self._queue.put(bytes(self._buffer))
+            self._buffer = bytearray()
+        self._queue.put(None)
+    
+    def _begin(self):
+        response = self.client.create_multipart_upload(
+            Bucket=self.bucket,
+            Key=self.key,
+            ContentType=self.content_type
+        )
+        self.upload_id = response["UploadId"]
+    
+    def _run(self):
+        """Uploader thread: open the session up front, then push queued parts to R2 in order"""
+        # Created at recording start so the first part (and the final complete on
+        # the shutdown path) never pays for it
+        try:
+            self._begin()
+        except Exception as e:
+            logger.error(f"Could not start streaming upload of {self.key}: {e}")
+            self.error = e
+        
+        while True:
+            part = self._queue.get()
+            if part is None:
+                return
+            if self.error:
+                continue  # Keep draining so the producer is never blocked
+            try:
+                part_number = len(self._parts) + 1
+                response = self.client.upload_part(
+                    Bucket=self.bucket,
+                    Key=self.key,
+                    UploadId=self.upload_id,
+                    PartNumber=part_number,
+                    Body=part
+                )
+                self._parts.append({"PartNumber": part_number, "ETag": response["ETag"]})
+                self.bytes_uploaded += len(part)
+            except Exception as e:
+                logger.error(f"Streaming upload of {self.key} failed at part {len(self._parts) + 1}: {e}")
+                self.error = e
+    
+    def finish(self, timeout: Optional[float] = None) -> Optional[str]:
+        """
+        Wait for queued parts and complete the upload (blocking; run in a thread).
+        
+        Returns the storage key, or None if nothing usable was streamed.
+        """
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            self.error = self.error or TimeoutError("Streaming upload did not drain in time")
+        
+        if self.error or not self._parts:
+            self.abort()
+            return None
+        
+        self.client.complete_multipart_upload(
+            Bucket=self.bucket,
+            Key=self.key,
+            UploadId=self.upload_id,
+            MultipartUpload={"Parts": self._parts}
+        )
+        logger.info(f"Streaming upload complete: {self.key} ({self.bytes_uploaded / 1024 / 1024:.2f} MB, {len(self._parts)} parts)")
+        return self.key
+    
+    def cancel(self, timeout: Optional[float] = None):
+        """
+        Abandon the stream after close(): skip the parts still queued, wait for the
+        uploader thread (so the session exists if it is being created) and abort
+        (blocking; run in a thread)
+        """
+        self.error = self.error or RuntimeError("Streaming upload cancelled")
+        self._thread.join(timeout)
+        self.abort()
+    
+    def abort(self):
+        """Abort the multipart upload so R2 drops any uploaded parts"""
+        if not self.upload_id:
+            return
+        try:
+            self.client.abort_multipart_upload(
+                Bucket=self.bucket,
+                Key=self.key,
+                UploadId=self.upload_id
+            )
+        except Exception as e:
+            logger.warning(f"Could not abort multipart upload {self.key}: {e}")
+        self.upload_id = None
+
 
 class R2Uploader:
     """Handles uploading files to Cloudflare R2"""
     
     def __init__(self):
-        self.client = boto3.client(
-            "s3",
-            endpoint_url=f"https://{config.R2_ACCOUNT_ID}.r2.cloudflarestorage.com",
-            aws_access_key_id=config.R2_ACCESS_KEY_ID,
-            aws_secret_access_key=config.R2_SECRET_ACCESS_KEY,
-            config=BotoConfig(signature_version="s3v4"),
-            region_name="auto"
+        self.client = _r2_client(
+            config.R2_ACCOUNT_ID,
+            config.R2_ACCESS_KEY_ID,
+            config.R2_SECRET_ACCESS_KEY
         )
         self.bucket = config.R2_BUCKET_NAME
     
-    def upload_recording(
+    @staticmethod
+    def recording_key(user_id: str, meeting_id: str, filename: str) -> str:
+        """Storage path (key) for a recording file"""
+        return f"recordings/{user_id}/{meeting_id}/{filename}"
+    
+    def open_recording_stream(
+        self,
+        local_path: Path,
+        user_id: str,
+        meeting_id: str
+    ) -> MultipartStreamUpload:
+        """Start a streaming multipart upload for a recording that is still being written"""
+        storage_path = self.recording_key(user_id, meeting_id, local_path.name)
+        logger.info(f"Streaming recording to R2 while recording: {storage_path}")
+        return MultipartStreamUpload(self.client, self.bucket, storage_path, "video/mp4")
+    
+    async def upload_recording(
         self,
         local_path: Path,
         user_id: str,
@@ -40,7 +212,7 @@ class R2Uploader:
         Returns the storage path (key) in R2
         """
         # Build storage path: recordings/{user_id}/{meeting_id}/video.mp4
-        storage_path = f"recordings/{user_id}/{meeting_id}/{local_path.name}"
+        storage_path = self.recording_key(user_id, meeting_id, local_path.name)
         
         logger.info(f"Uploading {local_path} to R2: {storage_path}")
         
@@ -54,13 +226,15 @@ class R2Uploader:
             # Upload with content type
             content_type = "video/mp4" if local_path.suffix == ".mp4" else "audio/mpeg"
             
-            self.client.upload_file(
+            await asyncio.to_thread(
+                self.client.upload_file,
                 str(local_path),
                 self.bucket,
                 storage_path,
                 ExtraArgs={
                     "ContentType": content_type
-                }
+                },
+                Config=TRANSFER_CONFIG
             )
             
             logger.info(f"Upload complete: {storage_path}")
@@ -70,30 +244,41 @@ class R2Uploader:
             logger.error(f"Failed to upload to R2: {e}")
             raise
     
-    def upload_transcription(
+    async def upload_transcription(
         self,
-        local_path: Path,
+        source: Union[Path, bytes],
         user_id: str,
         meeting_id: str
     ) -> str:
         """
-        Upload transcription txt file to R2
+        Upload transcription txt to R2, from a local file or in-memory bytes
         
         Returns the storage path (key) in R2
         """
         storage_path = f"recordings/{user_id}/{meeting_id}/transcription.txt"
-        
-        logger.info(f"Uploading transcription {local_path} to R2: {storage_path}")
+        extra_args = {"ContentType": "text/plain; charset=utf-8"}
         
         try:
-            self.client.upload_file(
-                str(local_path),
-                self.bucket,
-                storage_path,
-                ExtraArgs={
-                    "ContentType": "text/plain; charset=utf-8"
-                }
-            )
+            if isinstance(source, bytes):
+                logger.info(f"Uploading transcription ({len(source)} bytes) to R2: {storage_path}")
+                await asyncio.to_thread(
+                    self.client.upload_fileobj,
+                    io.BytesIO(source),
+                    self.bucket,
+                    storage_path,
+                    ExtraArgs=extra_args,
+                    Config=TRANSFER_CONFIG
+                )
+            else:
+                logger.info(f"Uploading transcription {source} to R2: {storage_path}")
+                await asyncio.to_thread(
+                    self.client.upload_file,
+                    str(source),
+                    self.bucket,
+                    storage_path,
+                    ExtraArgs=extra_args,
+                    Config=TRANSFER_CONFIG
+                )
             
             logger.info(f"Transcription upload complete: {storage_path}")
             return storage_path
@@ -103,7 +288,7 @@ class R2Uploader:
             raise
     
     
-    def upload_captions_json(
+    async def upload_captions_json(
         self,
         local_path: Path,
         user_id: str,
@@ -119,13 +304,15 @@ class R2Uploader:
         logger.info(f"Uploading captions JSON {local_path} to R2: {storage_path}")
         
         try:
-            self.client.upload_file(
+            await asyncio.to_thread(
+                self.client.upload_file,
                 str(local_path),
                 self.bucket,
                 storage_path,
                 ExtraArgs={
                     "ContentType": "application/json"
-                }
+                },
+                Config=TRANSFER_CONFIG
             )
             
             logger.info(f"Captions JSON upload complete: {storage_path}")
@@ -3,16 +3,24 @@ Meeting Assistant - Scheduler Service
 Handles calendar sync and meeting scheduling
 """
 import asyncio
+import functools
 import json
 import logging
 import os
 import re
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from typing import Optional
 
+import asyncpg
+import google_auth_httplib2
+import httplib2
+import orjson
 import redis.asyncio as redis
+from dateutil.parser import isoparse
 from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+from googleapiclient.errors import HttpError
 from supabase import create_client
 
 # Configure logging
@@ -28,15 +36,172 @@ SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_KEY")
 GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
 GOOGLE_CLIENT_SECRET = os.getenv("GOOGLE_CLIENT_SECRET")
+# Direct Postgres connection for LISTEN (optional; without it the scheduler polls)
+DATABASE_URL = os.getenv("DATABASE_URL")
 BOT_JOIN_BEFORE_MINUTES = int(os.getenv("BOT_JOIN_BEFORE_MINUTES", "2"))
+GOOGLE_HTTP_TIMEOUT = 30  # seconds
+# Access tokens minted from users' refresh tokens are cached in Redis until
+# shortly before they expire (~1h), instead of being refreshed every sync
+GOOGLE_ACCESS_TOKEN_KEY = "google:access_token:{user_id}"
+GOOGLE_ACCESS_TOKEN_MARGIN = 60  # seconds
 
 # Calendar sync interval (seconds)
 CALENDAR_SYNC_INTERVAL = 300  # 5 minutes
-MEETING_CHECK_INTERVAL = 30  # 30 seconds
+# Full syncs cover this window; incremental (syncToken) syncs in between only
+# return changes, so a daily full sync catches events moving into the window
+CALENDAR_SYNC_WINDOW_DAYS = 7
+CALENDAR_FULL_SYNC_INTERVAL = timedelta(days=1)
+MEETING_CHECK_INTERVAL = 30  # 30 seconds (polling fallback without LISTEN)
+# While polling finds nothing, the interval doubles per idle cycle up to the sweep
+MAX_IDLE_BACKOFF_CYCLES = 4
+# With LISTEN, the loop sleeps until the next meeting is due; this is the
+# ceiling sweep that catches missed notifications / clock drift
+MEETING_SWEEP_INTERVAL = 300  # 5 minutes
+# Postgres channel notified by the calendar_events trigger (migration 00007)
+CALENDAR_CHANGED_CHANNEL = "calendar_changed"
+# Wakeup sent by the manual sync task (not an event id)
+MANUAL_SYNC_WAKEUP = "calendar_sync"
+
+# Redis cache of recordable meetings: ZSET of event ids scored by start time,
+# plus a hash with each event row
+UPCOMING_MEETINGS_KEY = "meetings:upcoming"
+UPCOMING_EVENTS_KEY = "meetings:upcoming:events"
 
 # Meeting URL patterns
 MEET_PATTERN = re.compile(r'(https?://)?meet\.google\.com/[a-z]{3}-[a-z]{4}-[a-z]{3}', re.IGNORECASE)
 ZOOM_PATTERN = re.compile(r'(https?://)?([\w-]+\.)?zoom\.us/(j|my)/[\w\d-]+', re.IGNORECASE)
+# Both in one alternation; the named group that matched is the provider
+MEETING_URL_PATTERN = re.compile(
+    rf'(?P<google_meet>{MEET_PATTERN.pattern})|(?P<zoom>{ZOOM_PATTERN.pattern})',
+    re.IGNORECASE
+)
+
+
+# URL substring -> meeting provider, checked in order
+MEETING_PROVIDERS = (
+    ('meet.google.com', 'google_meet'),
+    ('zoom.us', 'zoom'),
+    ('teams.microsoft.com', 'teams'),
+)
+
+
+@functools.lru_cache(maxsize=4096)
+def detect_provider(url: str) -> str:
+    """Detect meeting provider from URL (recurring events repeat the same URLs)"""
+    for needle, provider in MEETING_PROVIDERS:
+        if needle in url:
+            return provider
+    return 'other'
+
+
+def _epoch(timestamp: str) -> float:
+    """Epoch seconds for an ISO timestamp (naive values, e.g. all-day dates, are UTC)"""
+    parsed = isoparse(timestamp)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+@functools.cache
+def _calendar_discovery() -> dict:
+    """Calendar v3 discovery document (bundled with google-api-python-client), parsed once"""
+    return json.loads(get_static_doc('calendar', 'v3'))
+
+
+@functools.cache
+def _google_http() -> httplib2.Http:
+    """HTTP connection to googleapis.com kept alive across all users' syncs"""
+    return httplib2.Http(timeout=GOOGLE_HTTP_TIMEOUT)
+
+
+def build_calendar_service(credentials: Credentials):
+    """Calendar API client for one user's credentials over the shared connection"""
+    # Syncs run one user at a time (one request in flight), so sharing the
+    # (not thread-safe) httplib2.Http is fine
+    http = google_auth_httplib2.AuthorizedHttp(credentials, http=_google_http())
+    return build_from_document(_calendar_discovery(), http=http)
+
+
+async def _execute(query):
+    """Run a supabase-py query (a blocking HTTPS request) without blocking the event loop"""
+    return await asyncio.to_thread(query.execute)
+
+
+class UpcomingMeetingsCache:
+    """
+    Recordable calendar events kept in Redis, so the scheduler doesn't query
+    calendar_events on every check. Filled by calendar sync, updated on event
+    change notifications and rebuilt from Supabase every sync interval.
+    """
+    
+    def __init__(self, redis_client):
+        self.redis_client = redis_client
+    
+    @staticmethod
+    def is_recordable(row: dict) -> bool:
+        return bool(
+            row.get('id')
+            and row.get('should_record')
+            and row.get('status') == 'confirmed'
+            and row.get('start_time')
+            and row.get('end_time')
+            and _epoch(row['end_time']) > datetime.now(timezone.utc).timestamp()
+        )
+    
+    async def update(self, rows: list):
+        """Add recordable rows and drop the rest"""
+        if not rows:
+            return
+        pipe = self.redis_client.pipeline(transaction=False)
+        for row in rows:
+            self._stage(pipe, row)
+        await pipe.execute()
+    
+    async def rebuild(self, rows: list):
+        """Replace the whole cache with the given rows"""
+        pipe = self.redis_client.pipeline(transaction=True)
+        pipe.delete(UPCOMING_MEETINGS_KEY, UPCOMING_EVENTS_KEY)
+        for row in rows:
+            self._stage(pipe, row)
+        await pipe.execute()
+    
+    def _stage(self, pipe, row: dict):
+        if self.is_recordable(row):
+            pipe.zadd(UPCOMING_MEETINGS_KEY, {row['id']: _epoch(row['start_time'])})
+            pipe.hset(UPCOMING_EVENTS_KEY, row['id'], orjson.dumps(row))
+        elif row.get('id'):
+            pipe.zrem(UPCOMING_MEETINGS_KEY, row['id'])
+            pipe.hdel(UPCOMING_EVENTS_KEY, row['id'])
+    
+    async def remove(self, event_ids: list):
+        if not event_ids:
+            return
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.zrem(UPCOMING_MEETINGS_KEY, *event_ids)
+        pipe.hdel(UPCOMING_EVENTS_KEY, *event_ids)
+        await pipe.execute()
+    
+    async def due(self, until_epoch: float) -> tuple[list, list]:
+        """Cached rows starting at or before until_epoch, and ids whose row is missing"""
+        event_ids = await self.redis_client.zrangebyscore(UPCOMING_MEETINGS_KEY, '-inf', until_epoch)
+        if not event_ids:
+            return [], []
+        
+        rows, missing = [], []
+        for event_id, raw in zip(event_ids, await self.redis_client.hmget(UPCOMING_EVENTS_KEY, event_ids), strict=True):
+            if raw:
+                rows.append(orjson.loads(raw))
+            else:
+                # Replies are raw bytes; ids go back into Supabase queries
+                missing.append(event_id.decode())
+        return rows, missing
+    
+    async def next_start(self, after_epoch: float) -> Optional[float]:
+        """Epoch start of the first cached meeting starting after after_epoch"""
+        result = await self.redis_client.zrangebyscore(
+            UPCOMING_MEETINGS_KEY, f"({after_epoch}", '+inf', start=0, num=1, withscores=True
+        )
+        return result[0][1] if result else None
 
 
 class CalendarSync:
@@ -45,16 +210,17 @@ class CalendarSync:
     def __init__(self, supabase, redis_client):
         self.supabase = supabase
         self.redis_client = redis_client
+        self.upcoming = UpcomingMeetingsCache(redis_client)
     
     async def sync_all_users(self):
         """Sync calendars for all users with connected Google Calendar"""
         logger.info("Starting calendar sync for all users")
         
         # Get all active users with Google refresh tokens and settings
-        result = self.supabase.table('users')\
-            .select('id, email, google_refresh_token, settings')\
-            .not_.is_('google_refresh_token', 'null')\
-            .execute()
+        query = self.supabase.table('users')\
+            .select('id, email, google_refresh_token, google_sync_token, google_sync_token_at, settings')\
+            .not_.is_('google_refresh_token', 'null')
+        result = await _execute(query)
         
         users = result.data or []
         logger.info(f"Found {len(users)} users with connected calendars")
@@ -78,44 +244,133 @@ class CalendarSync:
         
         logger.info(f"Syncing calendar for user {user_id}")
         
-        # Build Google Calendar service
+        # Build Google Calendar service (an expired cached token is refreshed on 401)
+        token_key = GOOGLE_ACCESS_TOKEN_KEY.format(user_id=user_id)
+        cached_token = await self.redis_client.get(token_key)
         credentials = Credentials(
-            token=None,
+            token=cached_token.decode() if cached_token else None,
             refresh_token=refresh_token,
             token_uri="https://oauth2.googleapis.com/token",
             client_id=GOOGLE_CLIENT_ID,
             client_secret=GOOGLE_CLIENT_SECRET
         )
         
-        service = build('calendar', 'v3', credentials=credentials)
-        
-        # Get events for next 7 days
-        now = datetime.utcnow()
-        time_min = now.isoformat() + 'Z'
-        time_max = (now + timedelta(days=7)).isoformat() + 'Z'
+        service = build_calendar_service(credentials)
         
-        events_result = service.events().list(
-            calendarId='primary',
-            timeMin=time_min,
-            timeMax=time_max,
-            maxResults=50,
-            singleEvents=True,
-            orderBy='startTime'
-        ).execute()
+        # Incremental sync while the token is fresh, otherwise a full sync of the window
+        sync_token = user.get('google_sync_token')
+        token_at = user.get('google_sync_token_at')
+        full_sync_due = (datetime.now(timezone.utc) - CALENDAR_FULL_SYNC_INTERVAL).timestamp()
+        if not token_at or _epoch(token_at) < full_sync_due:
+            sync_token = None
         
-        events = events_result.get('items', [])
-        logger.info(f"Found {len(events)} events for user {user_id}")
+        # The Google client is blocking as well
+        try:
+            events, next_sync_token = await asyncio.to_thread(self._list_events, service, sync_token)
+        except HttpError as e:
+            if not sync_token or e.resp.status != 410:
+                raise
+            # 410 Gone: the sync token expired, start over with a full sync
+            logger.info(f"Sync token expired for user {user_id}, running a full sync")
+            sync_token = None
+            events, next_sync_token = await asyncio.to_thread(self._list_events, service, None)
+        
+        # Keep the token for the next syncs if this one minted a new one
+        if credentials.token and credentials.expiry and credentials.token.encode() != cached_token:
+            ttl = int((credentials.expiry - datetime.utcnow()).total_seconds()) - GOOGLE_ACCESS_TOKEN_MARGIN
+            if ttl > 0:
+                await self.redis_client.set(token_key, credentials.token, ex=ttl)
+        
+        sync_kind = "changed" if sync_token else "upcoming"
+        logger.info(f"Found {len(events)} {sync_kind} events for user {user_id}")
+        
+        # Deleted/cancelled events come back (in incremental syncs) with only their id
+        cancelled_ids = [e['id'] for e in events if e.get('status') == 'cancelled' and e.get('id')]
+        rows = [
+            row for row in (self._build_event_row(user_id, e) for e in events if e.get('status') != 'cancelled')
+            if row
+        ]
+        
+        upserted = []
+        if rows:
+            # One upsert for all of the user's events instead of one round-trip each
+            try:
+                result = await _execute(self.supabase.table('calendar_events').upsert(
+                    rows,
+                    on_conflict='user_id,external_event_id'
+                ))
+                upserted = result.data or []
+                logger.info(f"Upserted {len(rows)} events for user {user_id}")
+            except Exception as e:
+                logger.error(f"Batch upsert failed for user {user_id}, retrying per event: {e}")
+                # Per-row retry isolates the offending event(s) in the logs; the
+                # sync token is kept, so these changes are fetched again next sync
+                for row in rows:
+                    await self._upsert_event_row(row)
+                return
+        
+        if cancelled_ids:
+            query = self.supabase.table('calendar_events')\
+                .update({"status": "cancelled"})\
+                .eq('user_id', user_id)\
+                .in_('external_event_id', cancelled_ids)
+            result = await _execute(query)
+            upserted.extend(result.data or [])
+            logger.info(f"Cancelled {len(result.data or [])} events for user {user_id}")
+        
+        if next_sync_token:
+            update = {"google_sync_token": next_sync_token}
+            if not sync_token:
+                update["google_sync_token_at"] = datetime.now(timezone.utc).isoformat()
+            await _execute(self.supabase.table('users').update(update).eq('id', user_id))
+        
+        # Upserted rows (with their ids) go straight into the upcoming cache;
+        # cancelled ones are dropped from it
+        try:
+            await self.upcoming.update(upserted)
+        except Exception as e:
+            logger.warning(f"Could not update upcoming meetings cache for user {user_id}: {e}")
+    
+    def _list_events(self, service, sync_token: Optional[str]) -> tuple[list, Optional[str]]:
+        """
+        All pages of the user's primary calendar events: changes since sync_token,
+        or (without one) events in the sync window. Returns (events, nextSyncToken).
+        """
+        if sync_token:
+            params = {"syncToken": sync_token}
+        else:
+            now = datetime.utcnow()
+            params = {
+                "timeMin": now.isoformat() + 'Z',
+                "timeMax": (now + timedelta(days=CALENDAR_SYNC_WINDOW_DAYS)).isoformat() + 'Z',
+            }
         
-        for event in events:
-            await self.process_event(user_id, event)
+        events = []
+        page_token = None
+        while True:
+            events_result = service.events().list(
+                calendarId='primary',
+                maxResults=250,
+                singleEvents=True,
+                pageToken=page_token,
+                **params
+            ).execute()
+            events.extend(events_result.get('items', []))
+            
+            page_token = events_result.get('nextPageToken')
+            if not page_token:
+                # Only the last page carries the sync token
+                return events, events_result.get('nextSyncToken')
     
-    async def process_event(self, user_id: str, event: dict):
-        """Process a single calendar event"""
-        event_id = event['id']
+    def _build_event_row(self, user_id: str, event: dict) -> Optional[dict]:
+        """Build the calendar_events row for a Google Calendar event (no DB access)"""
+        event_id = event.get('id')
+        if not event_id:
+            logger.warning(f"Skipping calendar event without id for user {user_id}")
+            return None
         
         # Extract meeting URL
-        meeting_url = self.extract_meeting_url(event)
-        meeting_provider = self.detect_provider(meeting_url) if meeting_url else None
+        meeting_url, meeting_provider = self.extract_meeting(event)
         should_record = meeting_url is not None
         
         # Parse times
@@ -125,8 +380,7 @@ class CalendarSync:
         start_time = start.get('dateTime') or start.get('date')
         end_time = end.get('dateTime') or end.get('date')
         
-        # Prepare event data
-        event_data = {
+        return {
             "user_id": user_id,
             "external_event_id": event_id,
             "title": event.get('summary', 'Untitled Meeting'),
@@ -140,60 +394,60 @@ class CalendarSync:
             "status": 'confirmed' if event.get('status') == 'confirmed' else 'tentative', # Map to allowed status
             "should_record": should_record
         }
-        
-        # Upsert to database
+    
+    async def _upsert_event_row(self, event_data: dict):
+        """Upsert a single calendar_events row"""
         try:
-            self.supabase.table('calendar_events').upsert(
+            await _execute(self.supabase.table('calendar_events').upsert(
                 event_data,
                 on_conflict='user_id,external_event_id'
-            ).execute()
-            logger.info(f"Processed event: {event_data['title']} (URL: {meeting_url})")
+            ))
+            logger.info(f"Processed event: {event_data['title']} (URL: {event_data['meeting_url']})")
         except Exception as e:
-            logger.error(f"Failed to upsert event {event_id}: {e}")
+            logger.error(f"Failed to upsert event {event_data['external_event_id']}: {e}")
     
     def extract_meeting_url(self, event: dict) -> Optional[str]:
         """Extract meeting URL from event"""
+        return self.extract_meeting(event)[0]
+    
+    def extract_meeting(self, event: dict) -> tuple[Optional[str], Optional[str]]:
+        """Extract meeting URL and provider from event"""
         # Check conferenceData first (official Google Meet)
         conference_data = event.get('conferenceData', {})
         entry_points = conference_data.get('entryPoints', [])
         
         for entry in entry_points:
             if entry.get('entryPointType') == 'video':
-                return entry.get('uri')
+                uri = entry.get('uri')
+                return uri, self.detect_provider(uri) if uri else None
         
         # Check description and location for URLs
-        description = event.get('description', '') or ''
-        location = event.get('location', '') or ''
-        text_to_search = f"{description} {location}"
-        
-        # Search for Meet URLs
-        meet_match = MEET_PATTERN.search(text_to_search)
-        if meet_match:
-            url = meet_match.group()
-            if not url.startswith('http'):
-                url = f"https://{url}"
-            return url
-        
-        # Search for Zoom URLs
-        zoom_match = ZOOM_PATTERN.search(text_to_search)
-        if zoom_match:
-            url = zoom_match.group()
-            if not url.startswith('http'):
-                url = f"https://{url}"
-            return url
-        
-        return None
+        description = event.get('description') or ''
+        location = event.get('location') or ''
+        if not description and not location:
+            return None, None
+        text_to_search = f"{description} {location}" if location else description
+        
+        # One pass for Meet and Zoom URLs; the matching group gives the provider
+        match = MEETING_URL_PATTERN.search(text_to_search)
+        if match is None:
+            return None, None
+        
+        provider = match.lastgroup
+        if provider == 'zoom':
+            # Meet links take precedence even when a Zoom link comes first
+            meet_match = MEET_PATTERN.search(text_to_search, match.end())
+            if meet_match:
+                match, provider = meet_match, 'google_meet'
+        
+        url = match.group()
+        if not url.startswith('http'):
+            url = f"https://{url}"
+        return url, provider
     
     def detect_provider(self, url: str) -> str:
         """Detect meeting provider from URL"""
-        if 'meet.google.com' in url:
-            return 'google_meet'
-        elif 'zoom.us' in url:
-            return 'zoom'
-        elif 'teams.microsoft.com' in url:
-            return 'teams'
-        else:
-            return 'other'
+        return detect_provider(url)
 
 
 class MeetingScheduler:
@@ -202,103 +456,182 @@ class MeetingScheduler:
     def __init__(self, supabase, redis_client):
         self.supabase = supabase
         self.redis_client = redis_client
+        self.upcoming = UpcomingMeetingsCache(redis_client)
     
-    async def check_upcoming_meetings(self):
-        """Check for meetings that need bots to join"""
+    async def refresh_upcoming_cache(self):
+        """Rebuild the upcoming meetings cache from calendar_events"""
         now = datetime.utcnow()
-        join_window = now + timedelta(minutes=BOT_JOIN_BEFORE_MINUTES)
-        
-        # Find events that:
-        # 1. Are about to start (start_time within join window) OR
-        # 2. Have already started but not ended yet (ongoing meetings)
-        # We use end_time > now to ensure the meeting is still happening
-        # Note: We append 'Z' to indicate UTC timezone for proper comparison
-        result = self.supabase.table('calendar_events')\
+        query = self.supabase.table('calendar_events')\
             .select('*')\
             .eq('should_record', True)\
             .eq('status', 'confirmed')\
-            .lte('start_time', join_window.isoformat() + 'Z')\
-            .gt('end_time', now.isoformat() + 'Z')\
-            .execute()
+            .gt('end_time', now.isoformat() + 'Z')
+        result = await _execute(query)
         
-        events = result.data or []
+        rows = result.data or []
+        await self.upcoming.rebuild(rows)
+        logger.debug(f"Upcoming meetings cache rebuilt: {len(rows)} events")
+    
+    async def refresh_events(self, event_ids: list):
+        """Re-read changed events (from NOTIFY) into the cache"""
+        query = self.supabase.table('calendar_events')\
+            .select('*')\
+            .in_('id', event_ids)
+        result = await _execute(query)
+        
+        rows = result.data or []
+        # Ids that no longer exist are dropped as well
+        found = {row['id'] for row in rows}
+        await self.upcoming.update(rows)
+        await self.upcoming.remove([event_id for event_id in event_ids if event_id not in found])
+    
+    async def check_upcoming_meetings(self) -> int:
+        """Check for meetings that need bots to join; returns how many were due"""
+        now = datetime.now(timezone.utc)
+        join_window = now + timedelta(minutes=BOT_JOIN_BEFORE_MINUTES)
         
-        if events:
-            logger.info(f"Found {len(events)} meetings to potentially join")
+        # Events that are about to start (start_time within join window) or have
+        # already started; the ones that ended are dropped below
+        events, missing = await self.upcoming.due(join_window.timestamp())
+        
+        # Cache miss: only those rows are read from Supabase
+        if missing:
+            query = self.supabase.table('calendar_events')\
+                .select('*')\
+                .in_('id', missing)
+            result = await _execute(query)
+            rows = result.data or []
+            await self.upcoming.update(rows)
+            found = {row['id'] for row in rows}
+            await self.upcoming.remove([event_id for event_id in missing if event_id not in found])
+            events.extend(row for row in rows if UpcomingMeetingsCache.is_recordable(row))
         
-        for event in events:
-            await self.schedule_bot_join(event)
-    
-    async def schedule_bot_join(self, event: dict):
-        """Schedule a bot to join a meeting"""
-        event_id = event['id']
-        user_id = event['user_id']
+        # We use end_time > now to ensure the meeting is still happening
+        ended = [e['id'] for e in events if _epoch(e['end_time']) <= now.timestamp()]
+        if ended:
+            await self.upcoming.remove(ended)
+            events = [e for e in events if e['id'] not in ended]
         
-        # Check if meeting already exists
-        existing = self.supabase.table('meetings')\
-            .select('id')\
-            .eq('calendar_event_id', event_id)\
-            .execute().data
+        if not events:
+            return 0
         
-        if existing:
+        logger.info(f"Found {len(events)} meetings to potentially join")
+        
+        await self.schedule_bot_joins(events)
+        # Handled (scheduled or already had a meeting); the periodic rebuild
+        # would re-add them, in which case the meetings check skips them again
+        await self.upcoming.remove([event['id'] for event in events])
+        return len(events)
+    
+    async def seconds_until_next_join(self) -> Optional[float]:
+        """Seconds until the next recordable meeting enters the join window (None if there is none)"""
+        join_window = datetime.now(timezone.utc) + timedelta(minutes=BOT_JOIN_BEFORE_MINUTES)
+        
+        next_start = await self.upcoming.next_start(join_window.timestamp())
+        if next_start is None:
+            return None
+        return next_start - join_window.timestamp()
+    
+    async def schedule_bot_joins(self, events: list):
+        """Schedule bots for a batch of events: 2 reads, 1 insert and 1 Redis round-trip in total"""
+        event_ids = [event['id'] for event in events]
+        
+        # Events that already have a meeting
+        query = self.supabase.table('meetings')\
+            .select('calendar_event_id')\
+            .in_('calendar_event_id', event_ids)
+        existing = (await _execute(query)).data or []
+        scheduled = {row['calendar_event_id'] for row in existing}
+        
+        events = [event for event in events if event['id'] not in scheduled]
+        for event_id in scheduled:
             logger.debug(f"Meeting already scheduled for event {event_id}")
+        if not events:
             return
         
         # Fetch user settings for bot configuration
-        user_result = self.supabase.table('users')\
-            .select('settings')\
-            .eq('id', user_id)\
-            .single()\
-            .execute()
-        
-        user_settings = user_result.data.get('settings', {}) if user_result.data else {}
-        bot_display_name = user_settings.get('bot_display_name', 'RKJ.AI')
-        bot_camera_enabled = user_settings.get('bot_camera_enabled', False)
-        
-        # Create meeting record
-        meeting = self.supabase.table('meetings').insert({
-            "user_id": user_id,
-            "calendar_event_id": event_id,
-            "title": event['title'],
-            "meeting_url": event['meeting_url'],
-            "meeting_provider": event['meeting_provider'],
-            "status": "scheduled",
-            "scheduled_start": event['start_time'],
-            "scheduled_end": event['end_time']
-        }).execute().data[0]
-        
-        meeting_id = meeting['id']
-        logger.info(f"Created meeting {meeting_id} for event {event_id}")
-        logger.info(f"  Bot Name: {bot_display_name}, Camera: {bot_camera_enabled}")
-        
-        # Enqueue bot join job
-        job = {
-            "id": meeting_id,
-            "data": {
-                "meeting_id": meeting_id,
+        user_ids = list({event['user_id'] for event in events})
+        query = self.supabase.table('users')\
+            .select('id, settings')\
+            .in_('id', user_ids)
+        users = (await _execute(query)).data or []
+        settings_by_user = {user['id']: user.get('settings') or {} for user in users}
+        
+        # Create meeting records
+        rows = [
+            {
+                "user_id": event['user_id'],
+                "calendar_event_id": event['id'],
+                "title": event['title'],
                 "meeting_url": event['meeting_url'],
                 "meeting_provider": event['meeting_provider'],
-                "user_id": user_id,
-                "bot_display_name": bot_display_name,
-                "bot_camera_enabled": bot_camera_enabled
-            },
-            "status": "queued",
-            "created_at": datetime.utcnow().isoformat()
-        }
-        
-        await self.redis_client.rpush("queue:join_meeting", json.dumps(job))
-        logger.info(f"Enqueued bot join job for meeting {meeting_id}")
+                "status": "scheduled",
+                "scheduled_start": event['start_time'],
+                "scheduled_end": event['end_time']
+            }
+            for event in events
+        ]
+        try:
+            meetings = (await _execute(self.supabase.table('meetings').insert(rows))).data or []
+        except Exception as e:
+            logger.error(f"Batch meeting insert failed for {len(rows)} events, retrying per event: {e}")
+            # Per-row retry so one bad event doesn't keep the rest of the batch
+            # from being scheduled on every cycle
+            meetings = [
+                meeting for meeting in [await self._insert_meeting_row(row) for row in rows]
+                if meeting
+            ]
+        meeting_by_event = {meeting['calendar_event_id']: meeting['id'] for meeting in meetings}
+        
+        # Enqueue bot join jobs (only for the events whose meeting was created)
+        events = [event for event in events if event['id'] in meeting_by_event]
+        if not events:
+            return
+        pipe = self.redis_client.pipeline(transaction=False)
+        for event in events:
+            event_id = event['id']
+            user_id = event['user_id']
+            meeting_id = meeting_by_event[event_id]
+            
+            user_settings = settings_by_user.get(user_id, {})
+            bot_display_name = user_settings.get('bot_display_name', 'RKJ.AI')
+            bot_camera_enabled = user_settings.get('bot_camera_enabled', False)
+            
+            logger.info(f"Created meeting {meeting_id} for event {event_id}")
+            logger.info(f"  Bot Name: {bot_display_name}, Camera: {bot_camera_enabled}")
+            
+            job = {
+                "id": meeting_id,
+                "data": {
+                    "meeting_id": meeting_id,
+                    "meeting_url": event['meeting_url'],
+                    "meeting_provider": event['meeting_provider'],
+                    "user_id": user_id,
+                    "bot_display_name": bot_display_name,
+                    "bot_camera_enabled": bot_camera_enabled
+                },
+                "status": "queued",
+                "created_at": datetime.utcnow().isoformat()
+            }
+            pipe.xadd("queue:join_meeting", {"payload": orjson.dumps(job)})
+        
+        await pipe.execute()
+        logger.info(f"Enqueued {len(events)} bot join job(s)")
+    
+    async def _insert_meeting_row(self, meeting_data: dict) -> Optional[dict]:
+        """Insert a single meetings row; returns it, or None if the insert failed"""
+        try:
+            result = await _execute(self.supabase.table('meetings').insert(meeting_data))
+            return (result.data or [None])[0]
+        except Exception as e:
+            logger.error(f"Failed to create meeting for event {meeting_data['calendar_event_id']}: {e}")
+            return None
 
 
-async def process_calendar_sync_queue(calendar_sync: CalendarSync, supabase, redis_client):
-    """Process pending calendar sync jobs from the queue"""
+async def process_calendar_sync_job(calendar_sync: CalendarSync, supabase, job_data: bytes):
+    """Process one manual calendar sync job"""
     try:
-        # Check for pending sync jobs (non-blocking)
-        job_data = await redis_client.lpop("queue:calendar_sync")
-        if not job_data:
-            return
-        
-        job = json.loads(job_data)
+        job = orjson.loads(job_data)
         data = job.get("data", {})
         user_id = data.get("user_id")
         
@@ -309,11 +642,11 @@ async def process_calendar_sync_queue(calendar_sync: CalendarSync, supabase, red
         logger.info(f"Processing manual calendar sync for user {user_id}")
         
         # Get user data
-        result = supabase.table('users')\
-            .select('id, email, google_refresh_token, settings')\
+        query = supabase.table('users')\
+            .select('id, email, google_refresh_token, google_sync_token, google_sync_token_at, settings')\
             .eq('id', user_id)\
-            .single()\
-            .execute()
+            .single()
+        result = await _execute(query)
         
         user = result.data
         if not user or not user.get('google_refresh_token'):
@@ -328,12 +661,69 @@ async def process_calendar_sync_queue(calendar_sync: CalendarSync, supabase, red
         logger.error(f"Error processing calendar sync job: {e}")
 
 
+async def calendar_sync_queue_loop(
+    calendar_sync: CalendarSync,
+    supabase,
+    redis_client,
+    wakeups: asyncio.Queue
+):
+    """Consume manual calendar sync jobs as they arrive (blocking pop, no polling)"""
+    while True:
+        try:
+            result = await redis_client.blpop("queue:calendar_sync", timeout=60)
+        except Exception as e:
+            logger.error(f"Error reading calendar sync queue: {e}")
+            await asyncio.sleep(5)
+            continue
+        
+        if result:
+            _, job_data = result
+            await process_calendar_sync_job(calendar_sync, supabase, job_data)
+            # New events may already be inside the join window
+            wakeups.put_nowait(MANUAL_SYNC_WAKEUP)
+
+
+async def start_calendar_listener(wakeups: asyncio.Queue):
+    """LISTEN for calendar_events changes; returns the connection, or None to fall back to polling"""
+    if not DATABASE_URL:
+        logger.info(f"DATABASE_URL not set, checking meetings every {MEETING_CHECK_INTERVAL}s")
+        return None
+    
+    try:
+        connection = await asyncpg.connect(DATABASE_URL)
+        await connection.add_listener(
+            CALENDAR_CHANGED_CHANNEL,
+            lambda _conn, _pid, _channel, payload: wakeups.put_nowait(payload)
+        )
+    except Exception as e:
+        logger.warning(f"Could not listen for calendar changes, falling back to polling: {e}")
+        return None
+    
+    logger.info(f"Listening for calendar changes on '{CALENDAR_CHANGED_CHANNEL}'")
+    return connection
+
+
+async def wait_for_calendar_change(wakeups: asyncio.Queue, timeout: float) -> set:
+    """Wait until a calendar change is signalled or the timeout expires; returns the payloads"""
+    try:
+        payloads = {await asyncio.wait_for(wakeups.get(), timeout)}
+    except asyncio.TimeoutError:
+        return set()
+    
+    # A batch upsert notifies once per row; handle the burst in one pass
+    await asyncio.sleep(1)
+    while not wakeups.empty():
+        payloads.add(wakeups.get_nowait())
+    return payloads
+
+
 async def main():
     """Main entry point"""
     logger.info("Starting Scheduler service")
     
     # Initialize clients
-    redis_client = redis.from_url(REDIS_URL, decode_responses=True)
+    # Replies stay bytes: payloads are parsed by orjson straight from them
+    redis_client = redis.from_url(REDIS_URL)
     await redis_client.ping()
     logger.info("Connected to Redis")
     
@@ -344,30 +734,60 @@ async def main():
     calendar_sync = CalendarSync(supabase, redis_client)
     meeting_scheduler = MeetingScheduler(supabase, redis_client)
     
+    # Calendar changes (NOTIFY) and manual syncs wake the loop early
+    wakeups: asyncio.Queue = asyncio.Queue()
+    listener = await start_calendar_listener(wakeups)
+    sync_queue_task = asyncio.create_task(
+        calendar_sync_queue_loop(calendar_sync, supabase, redis_client, wakeups)
+    )
+    
     # Track last sync time
     last_calendar_sync = datetime.min
+    # Consecutive polling cycles in which nothing happened
+    idle_cycles = 0
     
     try:
         while True:
             now = datetime.utcnow()
             
-            # Process any pending manual calendar sync jobs
-            await process_calendar_sync_queue(calendar_sync, supabase, redis_client)
-            
             # Run calendar sync periodically (for auto-enabled users)
             if (now - last_calendar_sync).total_seconds() >= CALENDAR_SYNC_INTERVAL:
                 await calendar_sync.sync_all_users()
+                # Full rebuild as the consistency fallback for the cache
+                await meeting_scheduler.refresh_upcoming_cache()
                 last_calendar_sync = now
             
-            # Check for upcoming meetings more frequently
-            await meeting_scheduler.check_upcoming_meetings()
+            due = await meeting_scheduler.check_upcoming_meetings()
+            
+            # Sleep until the next meeting is due or the next calendar sync,
+            # bounded by the sweep (or, without LISTEN, the polling interval,
+            # which backs off while idle since cached meetings still bound it)
+            if listener is not None and not listener.is_closed():
+                timeout = MEETING_SWEEP_INTERVAL
+            else:
+                timeout = min(MEETING_CHECK_INTERVAL * 2 ** idle_cycles, MEETING_SWEEP_INTERVAL)
+            
+            next_sync = CALENDAR_SYNC_INTERVAL - (datetime.utcnow() - last_calendar_sync).total_seconds()
+            timeout = min(timeout, next_sync)
+            
+            next_join = await meeting_scheduler.seconds_until_next_join()
+            if next_join is not None:
+                timeout = min(timeout, next_join)
+            
+            changed = await wait_for_calendar_change(wakeups, max(timeout, 1))
+            changed_ids = [p for p in changed if p != MANUAL_SYNC_WAKEUP]
+            if changed_ids:
+                await meeting_scheduler.refresh_events(changed_ids)
             
-            # Wait before next check
-            await asyncio.sleep(MEETING_CHECK_INTERVAL)
+            # Any activity resets the backoff
+            idle_cycles = 0 if (due or changed) else min(idle_cycles + 1, MAX_IDLE_BACKOFF_CYCLES)
             
     except KeyboardInterrupt:
         logger.info("Shutting down...")
     finally:
+        sync_queue_task.cancel()
+        if listener is not None:
+            await listener.close()
         await redis_client.close()
 
 
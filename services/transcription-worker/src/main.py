@@ -3,16 +3,26 @@ Meeting Assistant - Transcription Worker
 Consumes transcription jobs from Redis queue and processes with OpenAI Whisper API
 """
 import asyncio
-import json
+import difflib
+import functools
+import itertools
 import logging
 import os
+import random
+import re
+import socket
 import tempfile
-from datetime import datetime, timezone, timedelta
+from typing import Optional
 import math
 
+import asyncpg
+import httpx
+import msgpack
+import numpy as np
+import orjson
 import redis.asyncio as redis
-from openai import OpenAI
-from pydub import AudioSegment
+from redis.exceptions import ResponseError
+from openai import AsyncOpenAI
 import boto3
 from botocore.config import Config
 from botocore.exceptions import ClientError
@@ -30,6 +40,8 @@ logger = logging.getLogger(__name__)
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_KEY")
+# Optional direct Postgres connection for bulk writes (COPY); PostgREST is the fallback
+DATABASE_URL = os.getenv("DATABASE_URL")
 R2_ACCOUNT_ID = os.getenv("R2_ACCOUNT_ID")
 R2_ACCESS_KEY_ID = os.getenv("R2_ACCESS_KEY_ID")
 R2_SECRET_ACCESS_KEY = os.getenv("R2_SECRET_ACCESS_KEY")
@@ -40,61 +52,296 @@ WHISPER_MODEL = os.getenv("OPENAI_WHISPER_MODEL", "whisper-1")
 # OpenAI limits
 MAX_FILE_SIZE_MB = 25
 MAX_FILE_SIZE_BYTES = MAX_FILE_SIZE_MB * 1024 * 1024
+# Lifetime of the presigned R2 URL ffmpeg reads recordings from (seconds)
+PRESIGNED_URL_EXPIRY = 3600
 COST_PER_MINUTE_CENTS = 0.6  # $0.006 per minute
+# Retries (with the SDK's backoff) on 429/5xx/connection errors, per request
+OPENAI_MAX_RETRIES = 3
+# Chunks of a large file transcribed at once (bounded by OpenAI rate limits)
+MAX_CONCURRENT_CHUNKS = int(os.getenv("WHISPER_CONCURRENCY", "4"))
+# Consecutive chunks share this much audio, so no word is lost to a hard cut
+CHUNK_OVERLAP_MS = 1000
+# Slack (seconds) around the shared audio for Whisper's word timing when matching the overlap
+OVERLAP_MATCH_SLACK_SECONDS = 0.5
+# Shortest run of matching words trusted as the duplicated overlap
+OVERLAP_MIN_MATCH_WORDS = 2
+# Chunk cuts move to the nearest silence within this distance (ms) of the nominal cut
+SILENCE_SEARCH_WINDOW_MS = 5000
+SILENCE_NOISE_DB = -35
+SILENCE_MIN_SECONDS = 0.4
+_SILENCE_START = re.compile(r"silence_start: (-?[\d.]+)")
+_SILENCE_END = re.compile(r"silence_end: (-?[\d.]+)")
 
-# Queue name
+# Queue (a Redis Stream read through a consumer group)
 QUEUE_NAME = "queue:transcription"
+CONSUMER_GROUP = "workers"
+# Jobs left unacked this long (a crashed worker) are claimed by another worker
+JOB_VISIBILITY_TIMEOUT_MS = int(os.getenv("JOB_VISIBILITY_TIMEOUT", "3600")) * 1000
+RECLAIM_INTERVAL_SECONDS = 300
+# Jittered exponential backoff after loop errors (e.g. Redis unavailable)
+ERROR_BACKOFF_BASE_SECONDS = 1
+ERROR_BACKOFF_MAX_SECONDS = 60
 
+# Max rows per transcription_segments insert
+SEGMENT_INSERT_CHUNK = 500
+# Segment quality filter
+MIN_SEGMENT_CONFIDENCE = 0.4
+MIN_SEGMENT_TEXT_LENGTH = 3
 
-def format_timestamp(seconds: float) -> str:
-    """Format seconds to HH:MM:SS"""
-    td = timedelta(seconds=int(seconds))
-    hours, remainder = divmod(td.seconds, 3600)
+# Common Whisper hallucination patterns in Portuguese and English
+HALLUCINATION_PHRASES = frozenset([
+    "e aí",
+    "oi",
+    "obrigado por assistir",
+    "obrigada por assistir",
+    "se inscreva",
+    "inscreva-se",
+    "curta o vídeo",
+    "like",
+    "subscribe",
+    "thanks for watching",
+    "thank you for watching",
+    "legenda automática",
+    "legendas automáticas",
+    "subtitles by",
+    "subtítulos por",
+    "copyright",
+    "♪", "♫", "🎵",
+    "...",
+    "[música]",
+    "[music]",
+    "[aplausos]",
+    "[risos]",
+])
+_DOTS_AND_COMMAS = str.maketrans("", "", ".,")
+_PUNCTUATION_ONLY = re.compile(r'^[\s\.\,\!\?\;\:\-\_]+$')
+
+
+async def _execute(query):
+    """Run a supabase-py query (a blocking HTTPS request) without blocking the event loop"""
+    return await asyncio.to_thread(query.execute)
+
+
+@functools.lru_cache(maxsize=8192)
+def format_timestamp(seconds: int) -> str:
+    """Format whole seconds to HH:MM:SS (segments starting in the same second share the string)"""
+    hours, remainder = divmod(seconds, 3600)
     minutes, secs = divmod(remainder, 60)
-    if td.days > 0:
-        hours += td.days * 24
     return f"{hours:02d}:{minutes:02d}:{secs:02d}"
 
+async def _run_ffmpeg_tool(*args: str, log_output: bool = False) -> bytes:
+    """
+    Run ffmpeg/ffprobe without blocking the event loop and return its stdout
+    (or its log, stderr, for filters that report there)
+    """
+    process = await asyncio.create_subprocess_exec(
+        *args,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    stdout, stderr = await process.communicate()
+    if process.returncode != 0:
+        raise RuntimeError(f"{args[0]} failed: {stderr.decode(errors='replace').strip()}")
+    return stderr if log_output else stdout
+
+
+async def probe_audio(path: str) -> tuple[int, Optional[int]]:
+    """
+    Duration (ms) of a media file (or URL) and the bitrate (bits/s) of its audio
+    stream, if the container reports one. Read from metadata; nothing is decoded.
+    """
+    stdout = await _run_ffmpeg_tool(
+        "ffprobe", "-v", "error",
+        "-select_streams", "a:0",
+        "-show_entries", "format=duration:stream=bit_rate",
+        "-of", "json",
+        path
+    )
+    info = orjson.loads(stdout)
+    duration_ms = int(float(info["format"]["duration"]) * 1000)
+    
+    bit_rate = (info.get("streams") or [{}])[0].get("bit_rate")
+    return duration_ms, int(bit_rate) if bit_rate and bit_rate.isdigit() else None
+
+
+async def extract_audio_chunk(source: str, start_ms: int, end_ms: int) -> bytes:
+    """
+    Audio of [start_ms, end_ms) of a file (or URL), in memory. Stream copy (no
+    decode/re-encode); with input seeking only that range of the source is read.
+    """
+    return await _run_ffmpeg_tool(
+        "ffmpeg", "-v", "error",
+        "-ss", f"{start_ms / 1000:.3f}",
+        "-i", source,
+        "-t", f"{(end_ms - start_ms) / 1000:.3f}",
+        "-vn", "-c:a", "copy",
+        # Fragmented MP4 can go to a pipe (a regular one needs a seekable output)
+        "-f", "mp4", "-movflags", "frag_keyframe+empty_moov",
+        "pipe:1"
+    )
+
+
+def decode_job(payload: bytes) -> dict:
+    """
+    Job payloads are msgpack; JSON ones (producers not yet switched over,
+    jobs enqueued before the switch) are still accepted
+    """
+    try:
+        job = msgpack.unpackb(payload, raw=False)
+    except ValueError:
+        # JSON text is not valid msgpack ("{" unpacks as an int with extra data)
+        return orjson.loads(payload)
+    return job if isinstance(job, dict) else orjson.loads(payload)
+
+
+def _normalize_word(word: dict) -> str:
+    return word["word"].strip().lower().strip(".,!?;:")
+
+
+def dedupe_chunk_overlap(previous: dict, current: dict, previous_end: float, current_start: float):
+    """
+    Drop the words (and the text of segments) at the start of a chunk's result that
+    repeat the end of the previous chunk's, found as the longest common run of
+    words within the audio both chunks share. Timestamps are absolute seconds.
+    """
+    previous_words = previous.get("words") or []
+    words = current.get("words") or []
+    overlap = CHUNK_OVERLAP_MS / 1000
+    
+    # Only words inside the shared audio can be duplicates; the head is a prefix
+    # of the chunk's words, so nothing past the overlap is ever dropped
+    tail = [
+        w for w in previous_words
+        if w["start"] >= previous_end - overlap - OVERLAP_MATCH_SLACK_SECONDS
+    ]
+    head = list(itertools.takewhile(
+        lambda w: w["start"] < current_start + overlap + OVERLAP_MATCH_SLACK_SECONDS, words
+    ))
+    if not tail or not head:
+        return
+    
+    matcher = difflib.SequenceMatcher(
+        None, [_normalize_word(w) for w in tail], [_normalize_word(w) for w in head], autojunk=False
+    )
+    _, head_index, size = matcher.find_longest_match(0, len(tail), 0, len(head))
+    if size < OVERLAP_MIN_MATCH_WORDS:
+        return
+    
+    # The match and the overlap words before it are already in the previous chunk
+    dropped = head_index + size
+    cut = words[dropped - 1]["end"]
+    kept_words = words[dropped:]
+    current["words"] = kept_words
+    
+    segments = []
+    for segment in current.get("segments", []):
+        if segment["end"] <= cut:
+            continue
+        if segment["start"] < cut:
+            # Straddles the cut: rebuild it from the words that remain
+            rest = [w for w in kept_words if w["start"] < segment["end"]]
+            if not rest:
+                continue
+            segment["start"] = rest[0]["start"]
+            segment["text"] = " " + " ".join(w["word"].strip() for w in rest)
+        segments.append(segment)
+    current["segments"] = segments
+
+
+async def find_silence_near(source: str, target_ms: int) -> Optional[int]:
+    """
+    Middle (ms) of the silence closest to target_ms, within SILENCE_SEARCH_WINDOW_MS
+    either side, or None. Only that window of the file (or URL) is read and decoded.
+    """
+    window_start_ms = max(target_ms - SILENCE_SEARCH_WINDOW_MS, 0)
+    window_ms = target_ms + SILENCE_SEARCH_WINDOW_MS - window_start_ms
+    log = await _run_ffmpeg_tool(
+        "ffmpeg", "-hide_banner", "-nostats", "-v", "info",
+        "-ss", f"{window_start_ms / 1000:.3f}",
+        "-i", source,
+        "-t", f"{window_ms / 1000:.3f}",
+        "-vn", "-af", f"silencedetect=noise={SILENCE_NOISE_DB}dB:d={SILENCE_MIN_SECONDS}",
+        "-f", "null", "-",
+        log_output=True
+    )
+    text = log.decode(errors="replace")
+    
+    # Times are relative to the window; a silence still open at its end runs to it
+    starts = [max(float(t), 0) for t in _SILENCE_START.findall(text)]
+    ends = [float(t) for t in _SILENCE_END.findall(text)]
+    best = None
+    for i, start in enumerate(starts):
+        end = ends[i] if i < len(ends) else window_ms / 1000
+        middle = window_start_ms + int((start + end) / 2 * 1000)
+        if best is None or abs(middle - target_ms) < abs(best - target_ms):
+            best = middle
+    return best
+
+
 class SpeakerAttributor:
     """Attributes speakers to transcription segments using captured captions"""
     
+    TIME_TOLERANCE_MS = 5000  # 5 second tolerance
+    
     def __init__(self, captions_path: str):
-        self.captions = []
+        captions = []
         if os.path.exists(captions_path):
             try:
-                with open(captions_path, 'r') as f:
-                    self.captions = json.load(f)
-                logger.info(f"Loaded {len(self.captions)} caption segments for attribution")
+                with open(captions_path, 'rb') as f:
+                    captions = orjson.loads(f.read())
+                logger.info(f"Loaded {len(captions)} caption segments for attribution")
             except Exception as e:
                 logger.error(f"Failed to load captions: {e}")
+        
+        # Column arrays (not the parsed dicts), sorted by start so lookups are
+        # binary searches; speakers stored once each, referenced by code
+        count = len(captions)
+        starts = np.fromiter((seg['start_ms'] for seg in captions), dtype=np.int64, count=count)
+        ends = np.fromiter((seg['end_ms'] for seg in captions), dtype=np.int64, count=count)
+        speakers = np.array([seg['speaker'] for seg in captions], dtype=object)
+        self._speaker_names, speaker_codes = np.unique(speakers, return_inverse=True)
+        
+        order = np.argsort(starts, kind='stable')
+        self._starts = starts[order]
+        self._ends = ends[order]
+        self._speaker_codes = speaker_codes[order].astype(np.int32)
+        
+        # Captions can overlap (speakers talking at once): the latest end among
+        # captions started so far, and which caption holds it
+        self._max_ends = np.maximum.accumulate(self._ends)
+        self._max_end_idx = np.maximum.accumulate(
+            np.where(self._ends == self._max_ends, np.arange(count), 0)
+        )
     
     def get_speaker_at_time(self, timestamp_ms: int) -> str:
         """Get the speaker who was most likely active at a given timestamp"""
-        if not self.captions:
-            return None
-        
-        TIME_TOLERANCE_MS = 5000  # 5 second tolerance
-        
-        best_match = None
-        best_score = float('inf')
-        
-        for seg in self.captions:
-            # Check if timestamp falls within segment
-            if seg['start_ms'] <= timestamp_ms <= seg['end_ms']:
-                return seg['speaker']
-            
-            # Calculate distance to segment
-            if timestamp_ms < seg['start_ms']:
-                distance = seg['start_ms'] - timestamp_ms
-            else:
-                distance = timestamp_ms - seg['end_ms']
-            
-            # Keep track of closest segment within tolerance
-            if distance < TIME_TOLERANCE_MS and distance < best_score:
-                best_score = distance
-                best_match = seg['speaker']
-        
-        return best_match
+        return self.bulk_lookup(np.array([timestamp_ms], dtype=np.int64))[0]
+    
+    def bulk_lookup(self, starts_ms: np.ndarray) -> list:
+        """Get the most likely speaker (or None) for each timestamp, in one vectorized pass"""
+        count = len(self._starts)
+        if not count:
+            return [None] * len(starts_ms)
+        
+        # Last caption starting at or before each timestamp (-1 if none); of
+        # the captions started by then, the one ending last is the candidate
+        idx = np.searchsorted(self._starts, starts_ms, side='right') - 1
+        prev = np.maximum(idx, 0)
+        nxt = np.minimum(idx + 1, count - 1)
+        latest = self._max_end_idx[prev]
+        
+        inside = (idx >= 0) & (starts_ms <= self._max_ends[prev])
+        
+        # Otherwise the closest neighbour within tolerance (earlier one wins ties)
+        far = np.iinfo(np.int64).max
+        prev_dist = np.where(idx >= 0, starts_ms - self._max_ends[prev], far)
+        next_dist = np.where(idx + 1 < count, self._starts[nxt] - starts_ms, far)
+        nearest = np.where(next_dist < prev_dist, nxt, latest)
+        in_range = np.minimum(prev_dist, next_dist) < self.TIME_TOLERANCE_MS
+        
+        # Positions in the sorted columns, so codes resolve to the matched caption
+        match = np.where(inside, latest, np.where(in_range, nearest, -1))
+        return np.where(match >= 0, self._speaker_names[self._speaker_codes[match]], None).tolist()
 
 class TranscriptionWorker:
     """Worker that processes transcription jobs"""
@@ -102,13 +349,17 @@ class TranscriptionWorker:
     def __init__(self):
         self.redis_client = None
         self.supabase = None
+        self.pg = None
         self.openai = None
         self.r2 = None
+        # Stable across restarts of the same container, so its own pending jobs are resumed
+        self.consumer_name = f"{socket.gethostname()}-{os.getpid()}"
     
     async def initialize(self):
         """Initialize all clients"""
         # Redis
-        self.redis_client = redis.from_url(REDIS_URL, decode_responses=True)
+        # Replies stay bytes: job payloads are msgpack (binary)
+        self.redis_client = redis.from_url(REDIS_URL)
         await self.redis_client.ping()
         logger.info("Connected to Redis")
         
@@ -116,8 +367,29 @@ class TranscriptionWorker:
         self.supabase = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
         logger.info("Connected to Supabase")
         
+        # Postgres (bulk segment/word writes)
+        if DATABASE_URL:
+            try:
+                # No statement cache: safe behind pgbouncer in transaction mode
+                self.pg = await asyncpg.create_pool(
+                    DATABASE_URL, min_size=1, max_size=4, statement_cache_size=0
+                )
+                logger.info("Connected to Postgres")
+            except Exception as e:
+                logger.warning(f"Could not connect to Postgres, writing through Supabase: {e}")
+        
         # OpenAI
-        self.openai = OpenAI(api_key=OPENAI_API_KEY)
+        # Async client: chunk transcriptions run concurrently on the event loop,
+        # multiplexed over a kept-alive HTTP/2 connection for the worker's lifetime
+        self.openai = AsyncOpenAI(
+            api_key=OPENAI_API_KEY,
+            http_client=httpx.AsyncClient(
+                http2=True,
+                limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+                timeout=httpx.Timeout(600.0, connect=30.0)
+            ),
+            max_retries=OPENAI_MAX_RETRIES
+        )
         logger.info("OpenAI client initialized")
         
         # R2
@@ -126,30 +398,95 @@ class TranscriptionWorker:
             endpoint_url=f"https://{R2_ACCOUNT_ID}.r2.cloudflarestorage.com",
             aws_access_key_id=R2_ACCESS_KEY_ID,
             aws_secret_access_key=R2_SECRET_ACCESS_KEY,
-            config=Config(signature_version='s3v4'),
+            # Pool sized for the worker threads issuing R2 calls concurrently
+            config=Config(signature_version='s3v4', max_pool_connections=32),
             region_name='auto'
         )
         logger.info("Connected to Cloudflare R2")
     
     async def run(self):
         """Main worker loop"""
-        logger.info("Transcription worker started, waiting for jobs...")
+        await self.ensure_consumer_group()
+        logger.info(f"Transcription worker {self.consumer_name} started, waiting for jobs...")
         
+        reclaim_task = asyncio.create_task(self.reclaim_loop())
+        consecutive_errors = 0
+        try:
+            while True:
+                try:
+                    # Entries already delivered to this consumer but not acked
+                    # (reclaimed, or left by a crash under the same name) go first
+                    entries = await self.read_jobs("0") or await self.read_jobs(">", block=30000)
+                    
+                    for message_id, fields in entries:
+                        await self.handle_entry(message_id, fields)
+                    consecutive_errors = 0
+                        
+                except Exception as e:
+                    logger.error(f"Error in worker loop: {e}")
+                    delay = min(
+                        ERROR_BACKOFF_BASE_SECONDS * 2 ** min(consecutive_errors, 6) + random.random(),
+                        ERROR_BACKOFF_MAX_SECONDS
+                    )
+                    consecutive_errors += 1
+                    await asyncio.sleep(delay)
+        finally:
+            reclaim_task.cancel()
+    
+    async def ensure_consumer_group(self):
+        """Create the consumer group (and the stream) if they do not exist yet"""
+        try:
+            await self.redis_client.xgroup_create(QUEUE_NAME, CONSUMER_GROUP, id="0", mkstream=True)
+            logger.info(f"Created consumer group {CONSUMER_GROUP} on {QUEUE_NAME}")
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+    
+    async def read_jobs(self, stream_id: str, block: int = None) -> list:
+        """Read one entry for this consumer ("0": its pending entries, ">": new ones)"""
+        result = await self.redis_client.xreadgroup(
+            CONSUMER_GROUP, self.consumer_name, {QUEUE_NAME: stream_id}, count=1, block=block
+        )
+        return result[0][1] if result else []
+    
+    async def handle_entry(self, message_id: str, fields: dict):
+        """Process a stream entry, then acknowledge and delete it"""
+        try:
+            # Fields are empty when the entry was deleted after being delivered
+            if fields:
+                job = decode_job(fields[b"payload"])
+                
+                logger.info(f"Processing job: {job['id']}")
+                await self.process_job(job)
+        except Exception as e:
+            # The failure is already recorded (fail_transcription); a bad job is
+            # not a loop error, so it must not back off the whole queue
+            logger.error(f"Job {message_id} failed: {e}")
+        finally:
+            # Failed jobs are recorded on the transcription; only a crash leaves
+            # the entry pending for another worker to reclaim
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                pipe.xack(QUEUE_NAME, CONSUMER_GROUP, message_id)
+                pipe.xdel(QUEUE_NAME, message_id)
+                await pipe.execute()
+    
+    async def reclaim_loop(self):
+        """Periodically take over jobs that a crashed worker never acknowledged"""
         while True:
             try:
-                # Blocking pop from queue
-                result = await self.redis_client.blpop(QUEUE_NAME, timeout=30)
+                await asyncio.sleep(RECLAIM_INTERVAL_SECONDS)
                 
-                if result:
-                    _, job_json = result
-                    job = json.loads(job_json)
-                    
-                    logger.info(f"Processing job: {job['id']}")
-                    await self.process_job(job)
+                claimed = await self.redis_client.xautoclaim(
+                    QUEUE_NAME, CONSUMER_GROUP, self.consumer_name,
+                    min_idle_time=JOB_VISIBILITY_TIMEOUT_MS, justid=True
+                )
+                if claimed:
+                    logger.warning(f"Reclaimed {len(claimed)} stalled job(s): {claimed}")
                     
+            except asyncio.CancelledError:
+                break
             except Exception as e:
-                logger.error(f"Error in worker loop: {e}")
-                await asyncio.sleep(5)
+                logger.error(f"Error reclaiming stalled jobs: {e}")
     
     async def process_job(self, job: dict):
         """Process a single transcription job"""
@@ -162,174 +499,273 @@ class TranscriptionWorker:
         
         logger.info(f"Transcribing meeting {meeting_id}, recording {recording_id}")
         
-        # Get recording info
-        recording = self.supabase.table('recordings')\
-            .select('*')\
-            .eq('id', recording_id)\
-            .single()\
-            .execute().data
+        # Get recording info and create the transcription record (one round-trip,
+        # see migration 00009)
+        started = (await _execute(self.supabase.rpc('start_transcription', {
+            "p_recording_id": recording_id,
+            "p_meeting_id": meeting_id,
+            "p_language": language,
+            "p_model": WHISPER_MODEL
+        }))).data
         
-        if not recording:
+        if not started:
             logger.error(f"Recording not found: {recording_id}")
             return
         
-        # Create transcription record
-        transcription = self.supabase.table('transcriptions').insert({
-            "meeting_id": meeting_id,
-            "recording_id": recording_id,
-            "language": language,
-            "status": "processing",
-            "model_used": WHISPER_MODEL,
-            "processing_started_at": datetime.utcnow().isoformat()
-        }).execute().data[0]
-        
-        transcription_id = transcription["id"]
+        recording = started["recording"]
+        transcription_id = started["transcription"]["id"]
         
+        captions_task = None
         try:
-            # Download audio from R2
-            with tempfile.NamedTemporaryFile(suffix=".mp3", delete=False) as tmp_file:
-                local_path = tmp_file.name
+            storage_path = recording['storage_path']
             
-            logger.info(f"Downloading from R2: {recording['storage_path']}")
-            self.r2.download_file(R2_BUCKET_NAME, recording['storage_path'], local_path)
+            # Captions download while the audio is being transcribed
+            captions_task = asyncio.create_task(self.load_speaker_attributor(storage_path))
             
-            # Get audio duration
-            audio = AudioSegment.from_file(local_path)
-            duration_seconds = len(audio) / 1000
-            logger.info(f"Audio duration: {duration_seconds:.2f} seconds")
+            # The recording is never downloaded to disk: small files go from R2 to
+            # Whisper through memory, large ones are probed and cut by ffmpeg
+            # reading R2 over a presigned URL (ranged HTTP reads)
+            source_url = self.r2.generate_presigned_url(
+                'get_object',
+                Params={'Bucket': R2_BUCKET_NAME, 'Key': storage_path},
+                ExpiresIn=PRESIGNED_URL_EXPIRY
+            )
             
             # Check file size and process
-            file_size = os.path.getsize(local_path)
+            file_size = recording.get('file_size_bytes') or (await asyncio.to_thread(
+                self.r2.head_object, Bucket=R2_BUCKET_NAME, Key=storage_path
+            ))['ContentLength']
             
+            duration_ms = None
             if file_size > MAX_FILE_SIZE_BYTES:
+                # Get audio duration (from the container metadata; the audio is not decoded)
+                duration_ms, audio_bitrate = await probe_audio(source_url)
                 logger.info(f"File too large ({file_size / 1024 / 1024:.2f}MB), splitting...")
-                result = await self.transcribe_large_file(local_path, audio, language)
+                result = await self.transcribe_large_file(
+                    source_url, file_size, duration_ms, language, audio_bitrate
+                )
             else:
-                result = self.transcribe_file(local_path, language)
+                logger.info(f"Reading from R2: {storage_path}")
+                content = await asyncio.to_thread(self.read_object, storage_path)
+                result = await self.transcribe_file((Path(storage_path).name, content), language)
+                
+                # Whisper reports the duration it transcribed, so the one read of
+                # the object is enough
+                if result.get("duration") is not None:
+                    duration_ms = int(float(result["duration"]) * 1000)
+            
+            if duration_ms is None:
+                duration_ms, _ = await probe_audio(source_url)
+            duration_seconds = duration_ms / 1000
+            logger.info(f"Audio duration: {duration_seconds:.2f} seconds")
             
             # Calculate cost
             cost_cents = int(math.ceil(duration_seconds / 60) * COST_PER_MINUTE_CENTS)
             
-            # Process and save segments
+            # Process segments
             segments = self.process_segments(result, transcription_id)
             
-            if segments:
-                self.supabase.table('transcription_segments').insert(segments).execute()
-                logger.info(f"Saved {len(segments)} segments")
+            # Word timestamps are stored once, not repeated per segment row
+            words = result.get("words") or []
             
             # Format transcription with timestamps and speakers
             formatted_lines = []
             
-            # Try to download and load captions for attribution
-            captions_file = local_path.replace(".mp3", ".json")
-            attributor = None
+            # Speaker attribution from the captions, if the recording has them
+            attributor = await captions_task
             
-            try:
-                captions_path = recording['storage_path'].replace(Path(recording['storage_path']).name, "captions.json")
-                logger.info(f"Downloading captions from R2: {captions_path}")
-                self.r2.download_file(R2_BUCKET_NAME, captions_path, captions_file)
-                attributor = SpeakerAttributor(captions_file)
-            except ClientError as e:
-                if e.response['Error']['Code'] == "404":
-                    logger.info("No captions.json found for this recording")
-                else:
-                    logger.warning(f"Error checking for captions: {e}")
-            except Exception as e:
-                logger.warning(f"Failed to setup speaker attribution: {e}")
-
-            for segment in result.get("segments", []):
+            whisper_segments = result.get("segments", [])
+            if attributor:
+                # All segments attributed in one vectorized lookup
+                speakers = attributor.bulk_lookup(np.fromiter(
+                    (int(segment.get("start", 0) * 1000) for segment in whisper_segments),
+                    dtype=np.int64,
+                    count=len(whisper_segments)
+                ))
+            else:
+                speakers = [None] * len(whisper_segments)
+            
+            for segment, speaker in zip(whisper_segments, speakers, strict=True):
                 start_time = segment.get("start", 0)
-                start_ms = int(start_time * 1000)
-                timestamp = format_timestamp(start_time)
+                timestamp = format_timestamp(int(start_time))
                 text = segment.get("text", "").strip()
                 
-                speaker_prefix = ""
-                if attributor:
-                    speaker = attributor.get_speaker_at_time(start_ms)
-                    if speaker:
-                        speaker_prefix = f" [{speaker}]"
+                speaker_prefix = f" [{speaker}]" if speaker else ""
                 
                 formatted_lines.append(f"[{timestamp}]{speaker_prefix} {text}")
             
             full_text = "\n".join(formatted_lines)
             word_count = len(full_text.split())
             
-            # Parse start time and ensure it's timezone-aware
-            start_time = datetime.fromisoformat(
-                transcription["processing_started_at"].replace("Z", "+00:00")
-            )
-            if start_time.tzinfo is None:
-                start_time = start_time.replace(tzinfo=timezone.utc)
-
-            processing_time = int(
-                (datetime.now(timezone.utc) - start_time).total_seconds()
+            # Save segments and words, and complete the transcription and the meeting
+            await self.finalize_transcription(
+                transcription_id, meeting_id, segments, words,
+                full_text, word_count, int(duration_seconds), cost_cents
             )
             
-            self.supabase.table('transcriptions').update({
-                "status": "completed",
-                "full_text": full_text,
-                "word_count": word_count,
-                "audio_duration_seconds": int(duration_seconds),
-                "cost_cents": cost_cents,
-                "processing_completed_at": datetime.utcnow().isoformat(),
-                "processing_duration_seconds": processing_time
-            }).eq('id', transcription_id).execute()
-            
-            # Update meeting status
-            self.supabase.table('meetings').update({
-                "status": "completed"
-            }).eq('id', meeting_id).execute()
-            
+            logger.info(f"Saved {len(segments)} segments, {len(words)} words")
             logger.info(f"Transcription completed: {transcription_id}")
             logger.info(f"Cost: ${cost_cents / 100:.2f}, Words: {word_count}")
             
         except Exception as e:
             logger.error(f"Transcription failed: {e}")
             
-            self.supabase.table('transcriptions').update({
-                "status": "failed",
-                "error_message": str(e)
-            }).eq('id', transcription_id).execute()
-            
-            self.supabase.table('meetings').update({
-                "status": "failed",
-                "error_message": f"Transcription failed: {str(e)}"
-            }).eq('id', meeting_id).execute()
+            await _execute(self.supabase.rpc('fail_transcription', {
+                "p_transcription_id": transcription_id,
+                "p_meeting_id": meeting_id,
+                "p_error_message": str(e)
+            }))
             
             raise
         
         finally:
             # Cleanup
-            if 'local_path' in locals() and os.path.exists(local_path):
-                os.unlink(local_path)
-            if 'captions_file' in locals() and os.path.exists(captions_file):
-                os.unlink(captions_file)
+            if captions_task and not captions_task.done():
+                captions_task.cancel()
+    
+    async def finalize_transcription(
+        self,
+        transcription_id: str,
+        meeting_id: str,
+        segments: list,
+        words: list,
+        full_text: str,
+        word_count: int,
+        duration_seconds: int,
+        cost_cents: int
+    ):
+        """
+        Save the segments and words and mark the transcription and meeting completed
+        (processing time is measured by the database). Over Postgres this is one
+        transaction on one connection; through Supabase, one request per step.
+        """
+        if self.pg:
+            async with self.pg.acquire() as conn, conn.transaction():
+                await self.save_segments(segments, conn)
+                await self.save_words(transcription_id, words, conn)
+                await conn.execute(
+                    "SELECT public.finish_transcription($1::uuid, $2::uuid, $3, $4, $5, $6)",
+                    transcription_id, meeting_id, full_text, word_count, duration_seconds, cost_cents
+                )
+            return
+        
+        await self.save_segments(segments)
+        await self.save_words(transcription_id, words)
+        await _execute(self.supabase.rpc('finish_transcription', {
+            "p_transcription_id": transcription_id,
+            "p_meeting_id": meeting_id,
+            "p_full_text": full_text,
+            "p_word_count": word_count,
+            "p_audio_duration_seconds": duration_seconds,
+            "p_cost_cents": cost_cents
+        }))
+    
+    async def save_segments(self, segments: list, db=None):
+        """
+        Insert transcription segments: one binary COPY when given a Postgres
+        connection (or pool), else batched PostgREST inserts
+        """
+        if not segments:
+            return
+        
+        if db is not None:
+            columns = ("transcription_id", "segment_index", "start_time_ms", "end_time_ms", "text", "confidence")
+            await db.copy_records_to_table(
+                'transcription_segments',
+                records=[tuple(segment[column] for column in columns) for segment in segments],
+                columns=columns
+            )
+            return
+        
+        # Bounded batches keep each insert payload a reasonable size
+        for i in range(0, len(segments), SEGMENT_INSERT_CHUNK):
+            query = self.supabase.table('transcription_segments')\
+                .insert(segments[i:i + SEGMENT_INSERT_CHUNK])
+            await _execute(query)
     
-    def transcribe_file(self, file_path: str, language: str) -> dict:
-        """Transcribe a single file using OpenAI Whisper API"""
-        logger.info(f"Transcribing file: {file_path}")
-        
-        with open(file_path, "rb") as audio_file:
-            response = self.openai.audio.transcriptions.create(
-                model=WHISPER_MODEL,
-                file=audio_file,
-                language=language,
-                response_format="verbose_json",
-                timestamp_granularities=["segment", "word"]
+    async def save_words(self, transcription_id: str, words: list, db=None):
+        """Insert a transcription's word timestamps through bulk_insert_words (over Postgres if given)"""
+        if not words:
+            return
+        
+        if db is not None:
+            await db.execute(
+                "SELECT public.bulk_insert_words($1::uuid, $2::jsonb)",
+                transcription_id,
+                orjson.dumps(words).decode()
             )
+            return
+        
+        await _execute(self.supabase.rpc('bulk_insert_words', {
+            "p_transcription_id": transcription_id,
+            "p_words": words
+        }))
+    
+    async def load_speaker_attributor(self, storage_path: str) -> Optional["SpeakerAttributor"]:
+        """Download the recording's captions.json (off the event loop) into a SpeakerAttributor"""
+        captions_path = storage_path.replace(Path(storage_path).name, "captions.json")
+        with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as tmp_file:
+            captions_file = tmp_file.name
+        
+        try:
+            logger.info(f"Downloading captions from R2: {captions_path}")
+            await asyncio.to_thread(self.r2.download_file, R2_BUCKET_NAME, captions_path, captions_file)
+            return SpeakerAttributor(captions_file)
+        except ClientError as e:
+            if e.response['Error']['Code'] == "404":
+                logger.info("No captions.json found for this recording")
+            else:
+                logger.warning(f"Error checking for captions: {e}")
+        except Exception as e:
+            logger.warning(f"Failed to setup speaker attribution: {e}")
+        finally:
+            if os.path.exists(captions_file):
+                os.unlink(captions_file)
+        return None
+    
+    def read_object(self, key: str) -> bytes:
+        """Read a whole (small) R2 object into memory"""
+        return self.r2.get_object(Bucket=R2_BUCKET_NAME, Key=key)['Body'].read()
+    
+    async def transcribe_file(self, audio, language: str) -> dict:
+        """
+        Transcribe audio using OpenAI Whisper API. `audio` is a local file path
+        or a (filename, content) tuple already in memory.
+        """
+        if isinstance(audio, str):
+            logger.info(f"Transcribing file: {audio}")
+            # The SDK reads paths asynchronously
+            audio = Path(audio)
+        else:
+            logger.info(f"Transcribing {audio[0]} from memory")
+        
+        # Raw body parsed by orjson: plain dicts straight away, with no pydantic
+        # model built (and dumped again) over every segment and word
+        response = await self.openai.audio.transcriptions.with_raw_response.create(
+            model=WHISPER_MODEL,
+            file=audio,
+            language=language,
+            response_format="verbose_json",
+            timestamp_granularities=["segment", "word"]
+        )
         
-        return response.model_dump()
+        return orjson.loads(response.content)
     
     async def transcribe_large_file(
         self,
-        file_path: str,
-        audio: AudioSegment,
-        language: str
+        source: str,
+        file_size: int,
+        total_duration_ms: int,
+        language: str,
+        audio_bitrate: Optional[int] = None
     ) -> dict:
-        """Transcribe a large file by splitting into chunks"""
-        total_duration_ms = len(audio)
-        file_size = os.path.getsize(file_path)
-        bytes_per_ms = file_size / total_duration_ms
+        """Transcribe a large file (local path or URL) by splitting into chunks"""
+        # Chunks carry only the audio stream, so size them by its bitrate; the
+        # whole file (mostly video for recordings) is the fallback estimate
+        if audio_bitrate:
+            bytes_per_ms = audio_bitrate / 8 / 1000
+        else:
+            bytes_per_ms = file_size / total_duration_ms
         
         # Target 20MB per chunk
         target_chunk_bytes = 20 * 1024 * 1024
@@ -340,53 +776,91 @@ class TranscriptionWorker:
         
         logger.info(f"Splitting into {chunk_duration_ms / 1000 / 60:.1f} minute chunks")
         
+        # Nominal cuts, each moved to the nearest silence so no word is split
+        # (the hard cut stands when there is none, or the search fails)
+        targets = list(range(chunk_duration_ms, total_duration_ms, chunk_duration_ms))
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_CHUNKS)
+        
+        async def snap_to_silence(target_ms: int) -> int:
+            async with semaphore:
+                try:
+                    silence_ms = await find_silence_near(source, target_ms)
+                except Exception as e:
+                    logger.warning(f"Silence detection failed near {target_ms}ms: {e}")
+                    return target_ms
+            if silence_ms is None or silence_ms >= total_duration_ms:
+                return target_ms
+            return silence_ms
+        
+        cuts = await asyncio.gather(*(snap_to_silence(target_ms) for target_ms in targets))
+        
         chunks = []
         start = 0
-        while start < total_duration_ms:
-            end = min(start + chunk_duration_ms, total_duration_ms)
+        for end in [*cuts, total_duration_ms]:
             chunks.append((start, end))
-            start = end
+            start = end - CHUNK_OVERLAP_MS
         
         logger.info(f"Processing {len(chunks)} chunks")
         
-        all_segments = []
-        all_words = []
-        full_text_parts = []
-        
-        for i, (start_ms, end_ms) in enumerate(chunks):
-            logger.info(f"Processing chunk {i + 1}/{len(chunks)}")
-            
-            # Extract chunk
-            chunk_audio = audio[start_ms:end_ms]
+        # Exporting (ffmpeg reading from R2) and uploading to Whisper overlap: one
+        # producer cuts chunks ahead into a bounded queue, a few consumers upload
+        uploaders = min(MAX_CONCURRENT_CHUNKS, len(chunks))
+        queue: asyncio.Queue = asyncio.Queue(maxsize=uploaders)
+        results: list = [None] * len(chunks)
+        
+        async def export_chunks():
+            for i, (start_ms, end_ms) in enumerate(chunks):
+                try:
+                    # Cut straight into memory
+                    content = await extract_audio_chunk(source, start_ms, end_ms)
+                except Exception as e:
+                    results[i] = e
+                    continue
+                await queue.put((i, start_ms, content))
             
-            with tempfile.NamedTemporaryFile(suffix=".mp3", delete=False) as tmp:
-                chunk_path = tmp.name
-            
-            try:
-                chunk_audio.export(chunk_path, format="mp3")
-                
-                # Transcribe chunk
-                result = self.transcribe_file(chunk_path, language)
-                
-                # Adjust timestamps
-                for segment in result.get("segments", []):
-                    segment["start"] += start_ms / 1000
-                    segment["end"] += start_ms / 1000
-                    all_segments.append(segment)
-                
-                for word in result.get("words", []):
-                    word["start"] += start_ms / 1000
-                    word["end"] += start_ms / 1000
-                    all_words.append(word)
-                
-                full_text_parts.append(result.get("text", ""))
+            for _ in range(uploaders):
+                await queue.put(None)
+        
+        async def transcribe_chunks():
+            while (item := await queue.get()) is not None:
+                i, start_ms, content = item
+                logger.info(f"Processing chunk {i + 1}/{len(chunks)}")
                 
-            finally:
-                if os.path.exists(chunk_path):
-                    os.unlink(chunk_path)
+                # Let every chunk finish before surfacing a failure (a consumer
+                # that died would leave the producer blocked on the queue)
+                try:
+                    result = await self.transcribe_file((f"chunk_{i:03d}.m4a", content), language)
+                    
+                    # Adjust timestamps
+                    offset = start_ms / 1000
+                    for timed in itertools.chain(result.get("segments", []), result.get("words", [])):
+                        timed["start"] += offset
+                        timed["end"] += offset
+                    
+                    results[i] = result
+                except Exception as e:
+                    results[i] = e
+        
+        # Anything escaping one task cancels the others instead of orphaning them
+        async with asyncio.TaskGroup() as tasks:
+            tasks.create_task(export_chunks())
+            for _ in range(uploaders):
+                tasks.create_task(transcribe_chunks())
+        
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        
+        # Words in the overlap were transcribed twice; keep the earlier chunk's
+        for i in range(1, len(results)):
+            dedupe_chunk_overlap(results[i - 1], results[i], chunks[i - 1][1] / 1000, chunks[i][0] / 1000)
+        
+        # Results are in chunk order, so segments/words stay sorted by time
+        all_segments = list(itertools.chain.from_iterable(result.get("segments", []) for result in results))
+        all_words = list(itertools.chain.from_iterable(result.get("words", []) for result in results))
         
         return {
-            "text": " ".join(full_text_parts),
+            "text": " ".join(result.get("text", "") for result in results),
             "segments": all_segments,
             "words": all_words,
             "language": language
@@ -394,90 +868,60 @@ class TranscriptionWorker:
     
     def process_segments(self, result: dict, transcription_id: str) -> list:
         """Convert OpenAI response to database segment format with quality filtering"""
-        segments = []
-        MIN_CONFIDENCE = 0.4  # Minimum confidence threshold
-        MIN_TEXT_LENGTH = 3   # Minimum text length
+        # One lazy filtering pass; segment_index re-indexes after filtering
+        stripped = ((segment, segment.get("text", "").strip()) for segment in result.get("segments", []))
+        kept = ((segment, text) for segment, text in stripped if self._keep_segment(segment, text))
         
-        for i, segment in enumerate(result.get("segments", [])):
-            text = segment.get("text", "").strip()
-            confidence = segment.get("confidence")
-            
-            # Skip empty or too short text
-            if len(text) < MIN_TEXT_LENGTH:
-                logger.debug(f"Skipping short segment: '{text}'")
-                continue
-            
-            # Skip low confidence segments (if confidence is available)
-            if confidence is not None and confidence < MIN_CONFIDENCE:
-                logger.debug(f"Skipping low confidence segment ({confidence:.2f}): '{text}'")
-                continue
-            
-            # Filter out hallucinated patterns
-            if self._is_hallucination(text):
-                logger.debug(f"Skipping hallucinated segment: '{text}'")
-                continue
-            
-            segments.append({
+        return [
+            {
                 "transcription_id": transcription_id,
-                "segment_index": len(segments),  # Re-index after filtering
+                "segment_index": index,
                 "start_time_ms": int(segment["start"] * 1000),
                 "end_time_ms": int(segment["end"] * 1000),
                 "text": text,
-                "confidence": confidence,
-                "words": segment.get("words")
-            })
-        
-        return segments
+                "confidence": segment.get("confidence")
+            }
+            for index, (segment, text) in enumerate(kept)
+        ]
+    
+    def _keep_segment(self, segment: dict, text: str) -> bool:
+        """Quality filter for a segment (its text already stripped)"""
+        # Skip empty or too short text
+        if len(text) < MIN_SEGMENT_TEXT_LENGTH:
+            logger.debug("Skipping short segment: '%s'", text)
+            return False
+        
+        # Skip low confidence segments (if confidence is available)
+        confidence = segment.get("confidence")
+        if confidence is not None and confidence < MIN_SEGMENT_CONFIDENCE:
+            logger.debug("Skipping low confidence segment (%.2f): '%s'", confidence, text)
+            return False
+        
+        # Filter out hallucinated patterns
+        if self._is_hallucination(text):
+            logger.debug("Skipping hallucinated segment: '%s'", text)
+            return False
+        
+        return True
     
     def _is_hallucination(self, text: str) -> bool:
         """Detect common Whisper hallucination patterns"""
         text_lower = text.lower().strip()
         
-        # Common hallucination patterns in Portuguese and English
-        hallucination_patterns = [
-            "e aí",
-            "oi",
-            "obrigado por assistir",
-            "obrigada por assistir",
-            "se inscreva",
-            "inscreva-se",
-            "curta o vídeo",
-            "like",
-            "subscribe",
-            "thanks for watching",
-            "thank you for watching",
-            "legenda automática",
-            "legendas automáticas",
-            "subtitles by",
-            "subtítulos por",
-            "copyright",
-            "♪", "♫", "🎵",
-            "...",
-            "[música]",
-            "[music]",
-            "[aplausos]",
-            "[risos]",
-        ]
-        
-        # Check exact matches or starts with pattern
-        for pattern in hallucination_patterns:
-            if text_lower == pattern or text_lower == pattern + ".":
-                return True
-            # Check if the entire text is just the pattern repeated
-            if text_lower.replace(".", "").replace(",", "").strip() == pattern:
-                return True
+        # Exact matches, also with trailing dots or dots/commas scattered through
+        if text_lower in HALLUCINATION_PHRASES:
+            return True
+        if text_lower.translate(_DOTS_AND_COMMAS).strip() in HALLUCINATION_PHRASES:
+            return True
         
         # Detect repetitive patterns like "E aí E aí E aí"
         words = text_lower.split()
-        if len(words) >= 2:
-            unique_words = set(words)
-            # If very few unique words but many total words, likely repetitive
-            if len(unique_words) <= 2 and len(words) >= 4:
-                return True
+        if len(words) >= 4 and len(set(words)) <= 2:
+            # Very few unique words but many total words, likely repetitive
+            return True
         
         # Detect if text is just punctuation or symbols
-        import re
-        if re.match(r'^[\s\.\,\!\?\;\:\-\_\.\.\.]$', text):
+        if _PUNCTUATION_ONLY.match(text):
             return True
         
         return False
@@ -486,6 +930,10 @@ class TranscriptionWorker:
         """Cleanup resources"""
         if self.redis_client:
             await self.redis_client.close()
+        if self.pg:
+            await self.pg.close()
+        if self.openai:
+            await self.openai.close()
 
 
 async def main():
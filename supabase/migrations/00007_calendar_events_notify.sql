@@ -0,0 +1,23 @@
+-- ===========================================
+-- Meeting Assistant - Calendar Change Notifications
+-- ===========================================
+-- Migration: 00007_calendar_events_notify.sql
+-- Description: 
+--   Sends NOTIFY calendar_changed (payload: event id) whenever a calendar
+--   event is inserted or updated, so the scheduler can react immediately
+--   instead of polling calendar_events.
+
+CREATE OR REPLACE FUNCTION public.notify_calendar_changed()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('calendar_changed', NEW.id::text);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS calendar_events_notify_changed ON public.calendar_events;
+
+CREATE TRIGGER calendar_events_notify_changed
+    AFTER INSERT OR UPDATE ON public.calendar_events
+    FOR EACH ROW
+    EXECUTE FUNCTION public.notify_calendar_changed();
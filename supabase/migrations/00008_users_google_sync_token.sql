@@ -0,0 +1,14 @@
+-- ===========================================
+-- Meeting Assistant - Google Calendar Incremental Sync
+-- ===========================================
+-- Migration: 00008_users_google_sync_token.sql
+-- Description: 
+--   Stores the Google Calendar nextSyncToken per user, so the scheduler
+--   fetches only changed events instead of the whole 7-day window every
+--   sync. The token is replaced by a full sync once it is a day old
+--   (or when Google expires it), which also picks up events that moved
+--   into the sync window.
+
+ALTER TABLE public.users
+    ADD COLUMN IF NOT EXISTS google_sync_token TEXT,
+    ADD COLUMN IF NOT EXISTS google_sync_token_at TIMESTAMPTZ;
@@ -0,0 +1,93 @@
+-- ===========================================
+-- Meeting Assistant - Transcription Worker RPCs
+-- ===========================================
+-- Migration: 00009_transcription_rpc.sql
+-- Description: 
+--   Functions the transcription worker calls through supabase.rpc, so
+--   starting and finishing a transcription is one round-trip each and
+--   the transcription and meeting rows are updated in one transaction.
+
+-- Fetch the recording and create its 'processing' transcription.
+-- Returns {"recording": ..., "transcription": ...}, or NULL when the
+-- recording does not exist.
+CREATE OR REPLACE FUNCTION public.start_transcription(
+    p_recording_id UUID,
+    p_meeting_id UUID,
+    p_language TEXT,
+    p_model TEXT
+)
+RETURNS JSONB AS $$
+DECLARE
+    v_recording public.recordings;
+    v_transcription public.transcriptions;
+BEGIN
+    SELECT * INTO v_recording FROM public.recordings WHERE id = p_recording_id;
+    IF NOT FOUND THEN
+        RETURN NULL;
+    END IF;
+
+    INSERT INTO public.transcriptions (
+        meeting_id, recording_id, language, status, model_used, processing_started_at
+    )
+    VALUES (p_meeting_id, p_recording_id, p_language, 'processing', p_model, NOW())
+    RETURNING * INTO v_transcription;
+
+    RETURN jsonb_build_object(
+        'recording', to_jsonb(v_recording),
+        'transcription', to_jsonb(v_transcription)
+    );
+END;
+$$ LANGUAGE plpgsql;
+
+-- Mark the transcription and its meeting completed
+CREATE OR REPLACE FUNCTION public.finish_transcription(
+    p_transcription_id UUID,
+    p_meeting_id UUID,
+    p_full_text TEXT,
+    p_word_count INTEGER,
+    p_audio_duration_seconds INTEGER,
+    p_cost_cents INTEGER
+)
+RETURNS VOID AS $$
+BEGIN
+    UPDATE public.transcriptions
+    SET status = 'completed',
+        full_text = p_full_text,
+        word_count = p_word_count,
+        audio_duration_seconds = p_audio_duration_seconds,
+        cost_cents = p_cost_cents,
+        processing_completed_at = NOW(),
+        processing_duration_seconds = EXTRACT(EPOCH FROM NOW() - processing_started_at)::INTEGER
+    WHERE id = p_transcription_id;
+
+    UPDATE public.meetings SET status = 'completed' WHERE id = p_meeting_id;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Mark the transcription and its meeting failed
+CREATE OR REPLACE FUNCTION public.fail_transcription(
+    p_transcription_id UUID,
+    p_meeting_id UUID,
+    p_error_message TEXT
+)
+RETURNS VOID AS $$
+BEGIN
+    UPDATE public.transcriptions
+    SET status = 'failed',
+        error_message = p_error_message
+    WHERE id = p_transcription_id;
+
+    UPDATE public.meetings
+    SET status = 'failed',
+        error_message = 'Transcription failed: ' || p_error_message
+    WHERE id = p_meeting_id;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Only the worker (service role) may call these
+REVOKE EXECUTE ON FUNCTION public.start_transcription(UUID, UUID, TEXT, TEXT) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.finish_transcription(UUID, UUID, TEXT, INTEGER, INTEGER, INTEGER) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.fail_transcription(UUID, UUID, TEXT) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.start_transcription(UUID, UUID, TEXT, TEXT) TO service_role;
+GRANT EXECUTE ON FUNCTION public.finish_transcription(UUID, UUID, TEXT, INTEGER, INTEGER, INTEGER) TO service_role;
+GRANT EXECUTE ON FUNCTION public.fail_transcription(UUID, UUID, TEXT) TO service_role;
@@ -0,0 +1,60 @@
+-- ===========================================
+-- Meeting Assistant - Transcription Words
+-- ===========================================
+-- Migration: 00010_transcription_words.sql
+-- Description: 
+--   Word-level timestamps stored once per transcription instead of
+--   repeated in every transcription_segments row. The worker sends the
+--   whole word list as one JSON array to bulk_insert_words, which expands
+--   it into rows server-side.
+
+CREATE TABLE IF NOT EXISTS public.transcription_words (
+    transcription_id UUID NOT NULL REFERENCES public.transcriptions(id) ON DELETE CASCADE,
+    word_index INTEGER NOT NULL,
+    word TEXT NOT NULL,
+    -- Timing (milliseconds, like transcription_segments)
+    start_time_ms INTEGER NOT NULL,
+    end_time_ms INTEGER NOT NULL,
+    PRIMARY KEY (transcription_id, word_index)
+);
+
+CREATE INDEX IF NOT EXISTS idx_words_time ON public.transcription_words(transcription_id, start_time_ms);
+
+ALTER TABLE public.transcription_words ENABLE ROW LEVEL SECURITY;
+
+-- Transcription Words policies (through transcriptions)
+CREATE POLICY "Users can view own words"
+    ON public.transcription_words FOR SELECT
+    USING (
+        EXISTS (
+            SELECT 1 FROM public.transcriptions t
+            JOIN public.meetings m ON m.id = t.meeting_id
+            WHERE t.id = transcription_words.transcription_id
+            AND m.user_id = auth.uid()
+        )
+    );
+
+-- Insert a transcription's words from Whisper's [{word, start, end}, ...]
+-- (seconds) in one call
+CREATE OR REPLACE FUNCTION public.bulk_insert_words(
+    p_transcription_id UUID,
+    p_words JSONB
+)
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO public.transcription_words (
+        transcription_id, word_index, word, start_time_ms, end_time_ms
+    )
+    SELECT
+        p_transcription_id,
+        w.ordinality - 1,
+        w.value->>'word',
+        ((w.value->>'start')::NUMERIC * 1000)::INTEGER,
+        ((w.value->>'end')::NUMERIC * 1000)::INTEGER
+    FROM jsonb_array_elements(p_words) WITH ORDINALITY AS w(value, ordinality);
+END;
+$$ LANGUAGE plpgsql;
+
+-- Only the worker (service role) may call it
+REVOKE EXECUTE ON FUNCTION public.bulk_insert_words(UUID, JSONB) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.bulk_insert_words(UUID, JSONB) TO service_role;
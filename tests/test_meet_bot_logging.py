@@ -0,0 +1,59 @@
+"""
+Meet Bot - logging setup
+"""
+import importlib.util
+import io
+import logging
+import re
+from pathlib import Path
+
+MODULE_PATH = Path(__file__).resolve().parents[1] / "services" / "meet-bot" / "src" / "logging_setup.py"
+
+
+def _load_logging_setup():
+    spec = importlib.util.spec_from_file_location("meet_bot_logging_setup", MODULE_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_record_is_printed_once_in_configured_format():
+    logging_setup = _load_logging_setup()
+    root = logging.getLogger()
+    saved_handlers, saved_level = root.handlers[:], root.level
+
+    stream = io.StringIO()
+    listener = logging_setup.setup_logging("INFO", stream=stream)
+    try:
+        logging.getLogger("src.main").info("hello %s", "world")
+    finally:
+        listener.stop()  # flushes the queue
+        root.handlers[:] = saved_handlers
+        root.setLevel(saved_level)
+
+    lines = stream.getvalue().splitlines()
+    assert len(lines) == 1
+    assert re.fullmatch(r"\S+ \S+ - src\.main - INFO - hello world", lines[0])
+
+
+def test_traceback_is_printed_once():
+    logging_setup = _load_logging_setup()
+    root = logging.getLogger()
+    saved_handlers, saved_level = root.handlers[:], root.level
+
+    stream = io.StringIO()
+    listener = logging_setup.setup_logging("INFO", stream=stream)
+    try:
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            logging.getLogger("src.main").exception("failed")
+    finally:
+        listener.stop()
+        root.handlers[:] = saved_handlers
+        root.setLevel(saved_level)
+
+    output = stream.getvalue()
+    assert output.count("Traceback") == 1
+    assert output.count("ValueError: boom") == 1
+    assert " - src.main - ERROR - failed" in output
@@ -0,0 +1,75 @@
+"""
+Transcription Worker - caption-based speaker attribution
+"""
+import importlib.util
+import json
+from pathlib import Path
+
+import pytest
+
+MODULE_PATH = Path(__file__).resolve().parents[1] / "services" / "transcription-worker" / "src" / "main.py"
+
+# The worker module imports its clients at load time
+for _dependency in ("numpy", "orjson", "msgpack", "httpx", "asyncpg", "redis", "openai", "boto3", "supabase"):
+    pytest.importorskip(_dependency)
+
+
+@pytest.fixture(scope="module")
+def worker():
+    spec = importlib.util.spec_from_file_location("transcription_worker_main", MODULE_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _attributor(worker, tmp_path, captions):
+    path = tmp_path / "captions.json"
+    path.write_text(json.dumps(captions))
+    return worker.SpeakerAttributor(str(path))
+
+
+def _caption(speaker, start_ms, end_ms):
+    return {"speaker": speaker, "text": "...", "start_ms": start_ms, "end_ms": end_ms}
+
+
+def test_overlapping_captions_use_the_caption_that_contains_the_timestamp(worker, tmp_path):
+    attributor = _attributor(worker, tmp_path, [_caption("A", 0, 10000), _caption("B", 2000, 3000)])
+
+    assert attributor.get_speaker_at_time(5000) == "A"
+    assert attributor.get_speaker_at_time(2500) == "A"
+
+
+def test_overlapping_captions_measure_distance_from_the_latest_end(worker, tmp_path):
+    attributor = _attributor(worker, tmp_path, [_caption("A", 0, 20000), _caption("B", 2000, 3000)])
+
+    assert attributor.get_speaker_at_time(15000) == "A"
+    assert attributor.get_speaker_at_time(24000) == "A"
+    assert attributor.get_speaker_at_time(26000) is None
+
+
+def test_nearest_caption_within_tolerance(worker, tmp_path):
+    attributor = _attributor(worker, tmp_path, [_caption("A", 0, 2000), _caption("B", 5000, 7000)])
+
+    assert attributor.bulk_lookup(worker.np.array([1000, 3000, 4600, 6000, 13000], dtype=worker.np.int64)) == [
+        "A", "A", "B", "B", None
+    ]
+
+
+def test_no_captions(worker, tmp_path):
+    attributor = _attributor(worker, tmp_path, [])
+
+    assert attributor.get_speaker_at_time(1000) is None
+
+
+def test_speaker_codes_follow_the_containing_caption_after_sorting(worker, tmp_path):
+    # Out of order in the file, names not in code (alphabetical) order, overlapping
+    attributor = _attributor(worker, tmp_path, [
+        _caption("Zoe", 8000, 9000),
+        _caption("Bruno", 0, 30000),
+        _caption("Ana", 2000, 3000),
+    ])
+
+    assert attributor.bulk_lookup(worker.np.array([2500, 8500, 20000], dtype=worker.np.int64)) == [
+        "Bruno", "Bruno", "Bruno"
+    ]
+    assert attributor.get_speaker_at_time(31000) == "Bruno"